@@ -1,34 +1,31 @@
 #!/usr/bin/python
 
-def read_lines_from_file(filename):
-    """
-    Build a list of strings line-by-line from a file.
-
-    Input:
-    - filename: name of the file to read from
+import itertools
 
-    Returns:
-    - output: list of strings from the file
-    """
-    output = []
-    with open(filename, 'r') as lines:
-        for line in lines:
-            line = line.replace('\n', '')
-            output.append(line)
+import utils
 
-    return output
+# Number of lines parsed at a time when the changes are not read from a file
+LINES_PER_CHUNK = 1 << 16
 
-def find_repeated_frequency(ints):
+def find_repeated_frequency(ints, analytic=True):
     """
     Find the first frequency repeated when adding list of frequencies,
     looping through the list as needed.
 
     Input:
     - ints: list of integers
+    - analytic: whether to find the repeat from a single pass through the list
+        with first_repeat. Default is True. Otherwise, loop through the list
+        until a frequency is repeated, which never ends if none is
 
     Returns:
     - first frequency that is repeated
+        or None if no frequency is ever repeated (analytic mode only)
     """
+    if analytic:
+        import numpy as np
+        return first_repeat(np.cumsum(np.asarray(ints, dtype=np.int64)))
+
     # Current frequency
     curr = 0
 
@@ -48,7 +45,170 @@ def find_repeated_frequency(ints):
             freqs[curr] = True
             i += 1
 
+def first_repeat(prefix):
+    """
+    Find the first frequency repeated when looping through a list of changes,
+    from the frequencies reached during the first pass only.
+
+    Pass k reaches every frequency of the first pass plus k times the drift
+    (the frequency at the end of the first pass). So a frequency f of the
+    first pass is reached again only from the frequencies that are smaller
+    (for a positive drift) and equal to f modulo the drift, and first from the
+    closest one. Sorting the frequencies by remainder then value finds every
+    candidate repeat in O(n log n), whatever the number of passes.
+
+    Input:
+    - prefix: np.array of the frequencies reached after each change of the
+        first pass
+
+    Returns:
+    - first frequency that is repeated
+        or None if no frequency is ever repeated
+    """
+    import numpy as np
+
+    n = len(prefix)
+    if n == 0:
+        return None
+
+    # Repeats within the first pass come before any later ones
+    order = np.argsort(prefix, kind='stable')
+    equal = np.flatnonzero(prefix[order[1:]] == prefix[order[:-1]])
+    if equal.size > 0:
+        return int(prefix[order[equal + 1].min()])
+
+    drift = int(prefix[-1])
+    if drift == 0:
+        # The second pass repeats the first one
+        return int(prefix[0])
+
+    # Solve for a positive drift, flipping the signs if needed
+    sign = 1 if drift > 0 else -1
+    freqs = prefix * sign
+    drift = abs(drift)
+
+    remainders = freqs % drift
+    order = np.lexsort((freqs, remainders))
+    curr, succ = order[:-1], order[1:]
+    same = remainders[curr] == remainders[succ]
+    if not same.any():
+        return None
+    curr, succ = curr[same], succ[same]
+
+    # Change curr of pass k reaches the frequency of change succ of the first
+    # pass, with k = (freqs[succ] - freqs[curr]) / drift
+    times = (freqs[succ] - freqs[curr]) // drift * n + curr
+    return int(freqs[succ[np.argmin(times)]]) * sign
+
+def iter_changes(source, chunk_size=utils.CHUNK_SIZE):
+    """
+    Lazily parse frequency changes a chunk at a time. The changes of a file
+    are parsed once and loaded on later runs on the same file
+
+    Input:
+    - source: name of a file with one change per line, a LineFile, or an
+        iterable of lines
+    - chunk_size: number of bytes of changes of a file handled at a time.
+        Default is utils.CHUNK_SIZE
+
+    Returns:
+    - generator of np.array of int64 changes, one per chunk
+    """
+    filename = source if isinstance(source, str) else getattr(source,
+            'filename', None)
+
+    if filename is not None:
+        changes = utils.load_numbers(filename, 1).ravel()
+        step = max(chunk_size // changes.itemsize, 1)
+        for start in range(0, len(changes), step):
+            yield changes[start:start + step]
+        return
+
+    lines = iter(source)
+    while True:
+        batch = list(itertools.islice(lines, LINES_PER_CHUNK))
+        if not batch:
+            break
+        yield utils.parse_numbers(batch, 1).ravel()
+
+def iter_frequencies(source, chunk_size=utils.CHUNK_SIZE):
+    """
+    Lazily compute the frequencies reached after each change, a chunk at a
+    time, keeping a running total between chunks
+
+    Input:
+    - source: name of a file with one change per line, a LineFile, or an
+        iterable of lines
+    - chunk_size: number of bytes to read from a file at a time. Default is
+        utils.CHUNK_SIZE
+
+    Returns:
+    - generator of np.array of int64 frequencies, one per chunk
+    """
+    import numpy as np
+
+    curr = 0
+
+    for changes in iter_changes(source, chunk_size):
+        freqs = np.cumsum(changes)
+        freqs += curr
+
+        if freqs.size > 0:
+            curr = int(freqs[-1])
+        yield freqs
+
+def final_frequency(source, chunk_size=utils.CHUNK_SIZE):
+    """
+    Add up frequency changes without holding them all in memory
+
+    Input:
+    - source: name of a file with one change per line, a LineFile, or an
+        iterable of lines
+    - chunk_size: number of bytes to read from a file at a time. Default is
+        utils.CHUNK_SIZE
+
+    Returns:
+    - resulting frequency
+    """
+    return sum(int(changes.sum()) for changes in iter_changes(source, chunk_size))
+
+def scan_frequencies(source, chunk_size=utils.CHUNK_SIZE):
+    """
+    Find the resulting frequency and the first repeated frequency, parsing
+    the changes only once
+
+    Input:
+    - source: name of a file with one change per line, a LineFile, or an
+        iterable of lines
+    - chunk_size: number of bytes to read from a file at a time. Default is
+        utils.CHUNK_SIZE
+
+    Returns:
+    - tuple of:
+        - resulting frequency
+        - first frequency that is repeated, or None if none is ever repeated
+    """
+    import numpy as np
+
+    prefix = np.concatenate([np.zeros(0, dtype=np.int64)]
+            + list(iter_frequencies(source, chunk_size)))
+    final = int(prefix[-1]) if prefix.size > 0 else 0
+
+    return final, first_repeat(prefix)
+
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    return final_frequency(lines)
+
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    return scan_frequencies(lines)[1]
+
 if __name__ == '__main__':
-    lines = read_lines_from_file('input.txt')
-    ints = [int(line) for line in lines]
-    print(find_repeated_frequency(ints))
+    final, repeated = scan_frequencies('input.txt')
+    print(final)
+    print(repeated)
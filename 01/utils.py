@@ -0,0 +1,16 @@
+#!/usr/bin/python
+
+import os
+import sys
+
+# Make the shared modules at the top of the repository importable when a day is
+# run from its own directory
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from common.inputs import (CHUNK_SIZE, LineFile, file_digest, iter_chunks,
+        iter_lines, map_file, read_lines_from_file)
+from common.instrument import instrument
+from common.parse import (load_numbers, load_table, parse_numbers, parse_table,
+        read_numbers)
@@ -1,58 +1,216 @@
 #!/usr/bin/python
 
-def read_lines_from_file(filename):
+import itertools
+import pickle
+
+import utils
+
+# Number of IDs whose letters are counted at a time
+IDS_PER_CHUNK = 1 << 14
+
+def pack_ids(ids, width=None):
+    """
+    Pack IDs into a matrix of bytes, one row per ID
+
+    Input:
+    - ids: list of IDs
+    - width: number of columns. Default is None, which uses the length of the
+        longest ID. Shorter IDs are padded with zero bytes
+
+    Returns:
+    - np.array of uint8 of shape (number of IDs, width)
+    """
+    import numpy as np
+
+    ids = [x.encode() if isinstance(x, str) else x for x in ids]
+    if width is None:
+        width = max((len(x) for x in ids), default=0)
+
+    packed = b''.join(x.ljust(width, b'\0') for x in ids)
+    return np.frombuffer(packed, dtype=np.uint8).reshape(len(ids), width)
+
+def read_ids(source):
+    """
+    Load IDs into a matrix of bytes, one row per ID. A file whose lines all
+    have the same length is memory-mapped instead of read
+
+    Input:
+    - source: name of a file with one ID per line, a LineFile, or a list of
+        IDs
+
+    Returns:
+    - np.array of uint8 of shape (number of IDs, length of the longest ID)
+    """
+    import numpy as np
+
+    filename = source if isinstance(source, str) else getattr(source,
+            'filename', None)
+    if filename is None:
+        return pack_ids(source)
+
+    with open(filename, 'rb') as f:
+        first = f.readline()
+    width = len(first) - 1
+
+    if width > 0 and first.endswith(b'\n'):
+        data = np.memmap(filename, dtype=np.uint8, mode='r')
+
+        # Every line has the same length if every row ends with a newline
+        if data.size % (width + 1) == 0:
+            rows = data.reshape(-1, width + 1)
+            if np.all(rows[:, width] == ord('\n')):
+                return rows[:, :width]
+
+    return pack_ids(utils.iter_lines(filename))
+
+def iter_id_chunks(ids, chunk_size=IDS_PER_CHUNK):
     """
-    Build a list of strings line-by-line from a file.
+    Lazily split IDs into matrices of bytes
 
     Input:
-    - filename: name of the file to read from
+    - ids: list of IDs, or matrix of bytes from read_ids or pack_ids
+    - chunk_size: number of IDs in each chunk. Default is IDS_PER_CHUNK
 
     Returns:
-    - output: list of strings from the file
+    - generator of np.array of uint8, one row per ID
     """
-    output = []
-    with open(filename, 'r') as lines:
-        for line in lines:
-            line = line.replace('\n', '')
-            output.append(line)
+    if hasattr(ids, 'dtype'):
+        for i in range(0, len(ids), chunk_size):
+            yield ids[i:i+chunk_size]
+        return
 
-    return output
+    ids = iter(ids)
+    while True:
+        batch = list(itertools.islice(ids, chunk_size))
+        if not batch:
+            break
+        yield pack_ids(batch)
 
-def count_doubles_and_triples(ids):
+def count_doubles_and_triples(ids, chunk_size=IDS_PER_CHUNK):
     """
     Count number of IDs that have doubles or triples of letters
 
+    The letters of a chunk of IDs are counted at once: every letter is offset
+    by its row times the size of the alphabet, so a single bincount gives one
+    row of letter counts per ID.
+
     Input:
-    - ids: list of IDs
+    - ids: list of IDs, or matrix of bytes from read_ids or pack_ids
+    - chunk_size: number of IDs to count at a time. Default is IDS_PER_CHUNK
 
     Returns:
     - number of IDs with doubles of letters * those with triples of letters
     """
+    import numpy as np
+
     num_doubles = 0
     num_triples = 0
 
-    for curr_id in ids:
-        letters = dict()
+    for chunk in iter_id_chunks(ids, chunk_size):
+        if chunk.size == 0:
+            continue
 
-        for x in curr_id:
-            if x in letters:
-                letters[x] += 1
-            else:
-                letters[x] = 1
+        # Letters as bins from 0, with the zero bytes padding short IDs in
+        # bin 0
+        low = int(chunk.min())
+        num_bins = int(chunk.max()) - low + 1
+        bins = chunk.astype(np.int32) - low
+        bins += (np.arange(len(chunk), dtype=np.int32) * num_bins)[:, None]
 
-        found_double = False
-        found_triple = False
+        counts = np.bincount(bins.ravel(), minlength=len(chunk) * num_bins)
+        counts = counts.reshape(len(chunk), num_bins)
+        if low == 0:
+            counts[:, 0] = 0
 
-        for letter in letters:
-            if not found_double and letters[letter] == 2:
-                found_double = True
-                num_doubles += 1
-            if not found_triple and letters[letter] == 3:
-                found_triple = True
-                num_triples += 1
+        num_doubles += np.count_nonzero((counts == 2).any(axis=1))
+        num_triples += np.count_nonzero((counts == 3).any(axis=1))
 
     return num_doubles * num_triples
 
+def find_close_rows(matrix, k=1):
+    """
+    Find all pairs of rows of a matrix of IDs of the same length that differ
+    by at most k letters
+
+    For every choice of k positions, each ID is hashed with the letters at
+    those positions left out. Two IDs differing only at those positions get
+    the same hash, so sorting the hashes brings every close pair together,
+    and only IDs sharing a hash are compared letter by letter.
+
+    Input:
+    - matrix: np.array of uint8 from pack_ids, of IDs that all have the same
+        length
+    - k: maximum number of letters in which the IDs of a pair differ. Default
+        is 1
+
+    Returns:
+    - set of tuples (i, j) of rows with i < j
+    """
+    import numpy as np
+
+    width = matrix.shape[1]
+
+    # Hash every ID as a weighted sum of its letters, wrapping around 2**64
+    rng = np.random.default_rng(0)
+    weights = rng.integers(1, 2 ** 63, size=width, dtype=np.uint64)
+    weighted = matrix.astype(np.uint64) * weights
+    hashes = weighted.sum(axis=1, dtype=np.uint64)
+
+    pairs = set()
+
+    # Leaving out every position makes every pair a candidate
+    for positions in itertools.combinations(range(width), min(k, width)):
+        masked = hashes - weighted[:, positions].sum(axis=1, dtype=np.uint64)
+
+        order = np.argsort(masked, kind='stable')
+        sorted_hashes = masked[order]
+
+        # Runs of IDs sharing a hash
+        starts = np.flatnonzero(np.concatenate(([True],
+                sorted_hashes[1:] != sorted_hashes[:-1])))
+        ends = np.append(starts[1:], len(order))
+
+        for start, end in zip(starts[ends - starts > 1].tolist(),
+                ends[ends - starts > 1].tolist()):
+            for i, j in itertools.combinations(sorted(order[start:end].tolist()), 2):
+                if np.count_nonzero(matrix[i] != matrix[j]) <= k:
+                    pairs.add((i, j))
+
+    return pairs
+
+def find_close_pairs(ids, k=1):
+    """
+    Find all pairs of IDs of the same length that differ by at most k letters
+
+    Input:
+    - ids: list of IDs
+    - k: maximum number of letters in which the IDs of a pair differ. Default
+        is 1
+
+    Returns:
+    - list of tuples containing pairs of distinct IDs that differ by at most k
+        letters, sorted by the position of the first ID then the second one
+        in the list
+    """
+    # Close pairs are found between distinct IDs, in order of first appearance
+    ids = list(dict.fromkeys(ids))
+
+    # IDs of different lengths are never close, and padding shorter IDs
+    # would make them look so
+    # key: length of ID
+    # value: list of positions of the IDs of that length
+    by_length = {}
+    for position, box_id in enumerate(ids):
+        by_length.setdefault(len(box_id), []).append(position)
+
+    pairs = []
+    for positions in by_length.values():
+        matrix = pack_ids([ids[position] for position in positions])
+        pairs.extend((positions[i], positions[j])
+                for i, j in find_close_rows(matrix, k))
+
+    return [(ids[i], ids[j]) for i, j in sorted(pairs)]
+
 def find_close_pair(ids):
     """
     Find pair of IDs that differ by one letter
@@ -64,22 +222,155 @@ def find_close_pair(ids):
     - tuple containing pair of IDs that differ by one letter
         or None if no such pair exists
     """
-    for str1 in ids:
-        for str2 in ids:
-            if str1 == str2:
-                continue
+    pairs = find_close_pairs(ids, k=1)
+    return pairs[0] if pairs else None
+
+class BoxIndex:
+    """
+    Index of box IDs finding the IDs within a Hamming distance of a new one
+
+    Every ID is split into max_dist + 1 segments. An ID differing from the
+    query in at most max_dist letters has at least one segment equal to the
+    query's, so only the IDs sharing a segment with the query are compared.
+    """
+    def __init__(self, max_dist=1):
+        self.max_dist = max_dist
+        self.ids = []
+
+        # key: (length of ID, segment number)
+        # value: dictionary of segments
+        #     key: letters of the segment
+        #     value: index of the only ID with the segment, or list of indices
+        self.tables = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def segments(self, box_id):
+        """
+        Split an ID into max_dist + 1 segments of almost equal length
+
+        Input:
+        - box_id: an ID
+
+        Returns:
+        - list of (table key, letters of the segment) tuples
+        """
+        num_segments = self.max_dist + 1
+        length = len(box_id)
+
+        bounds = [length * i // num_segments for i in range(num_segments + 1)]
+        return [((length, i), box_id[bounds[i]:bounds[i+1]])
+                for i in range(num_segments)]
 
+    def add(self, box_id):
+        """
+        Add an ID to the index
+
+        Input:
+        - box_id: an ID
+        """
+        idx = len(self.ids)
+        self.ids.append(box_id)
+
+        for key, segment in self.segments(box_id):
+            table = self.tables.setdefault(key, {})
+            found = table.get(segment)
+
+            if found is None:
+                table[segment] = idx
+            elif isinstance(found, list):
+                found.append(idx)
+            else:
+                table[segment] = [found, idx]
+
+    def update(self, ids):
+        """
+        Add several IDs to the index
+
+        Input:
+        - ids: iterable of IDs
+        """
+        for box_id in ids:
+            self.add(box_id)
+
+    def query(self, box_id, k=None):
+        """
+        Find the IDs that differ from an ID by at most k letters
+
+        Input:
+        - box_id: an ID, which does not need to be in the index
+        - k: maximum number of differing letters, at most max_dist. Default is
+            None, which uses max_dist
+
+        Returns:
+        - list of IDs in the index within distance k, in order of insertion
+        """
+        k = self.max_dist if k is None else k
+        if k > self.max_dist:
+            raise ValueError('Index only supports distances up to %d.'
+                    % self.max_dist)
+
+        candidates = set()
+
+        for key, segment in self.segments(box_id):
+            found = self.tables.get(key, {}).get(segment)
+
+            if isinstance(found, list):
+                candidates.update(found)
+            elif found is not None:
+                candidates.add(found)
+
+        matches = []
+
+        for idx in sorted(candidates):
             num_diffs = 0
-            for i in range(len(str1)):
-                if str1[i] != str2[i]:
+            for x, y in zip(box_id, self.ids[idx]):
+                if x != y:
                     num_diffs += 1
 
-            if num_diffs == 1:
-                return (str1, str2)
+            if num_diffs <= k:
+                matches.append(self.ids[idx])
+
+        return matches
+
+    def save(self, filename):
+        """
+        Save the index to a file
+
+        Input:
+        - filename: name of the file to write to
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filename):
+        """
+        Load an index saved with save
+
+        Input:
+        - filename: name of the file to read from
+
+        Returns:
+        - the BoxIndex
+        """
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    return count_doubles_and_triples(read_ids(lines))
 
-    return None
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    return find_close_pair(list(lines))
 
 if __name__ == '__main__':
-    lines = read_lines_from_file('input.txt')
+    lines = utils.read_lines_from_file('input.txt')
     print(count_doubles_and_triples(lines))
     print(find_close_pair(lines))
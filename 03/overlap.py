@@ -1,13 +1,23 @@
 #!/usr/bin/python
 
-import re
-
 import utils
 
+# Largest bounding box, in square inches, analyzed with a dense grid
+GRID_CELL_LIMIT = 1 << 24
+
+# Square inches of bounding box per claim (times the log of the number of
+# claims) below which the grid is faster than the sweep line
+GRID_CELLS_PER_CLAIM = 1000
+
+# Fields of a claim, in the order they appear in the input
+CLAIM_FIELDS = ('idx', 'x', 'y', 'width', 'height')
+
 class Claim:
     """
     Claim defining a rectangle of fabric
     """
+    __slots__ = CLAIM_FIELDS
+
     def __init__(self, idx, x, y, width, height):
         self.idx = int(idx)
         self.x = int(x)
@@ -15,95 +25,620 @@ class Claim:
         self.width = int(width)
         self.height = int(height)
 
+class ClaimView:
+    """
+    Claim stored in a row of a ClaimStore, read through the same attributes
+    as a Claim
+    """
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    idx = property(lambda self: int(self.store.array['idx'][self.row]))
+    x = property(lambda self: int(self.store.array['x'][self.row]))
+    y = property(lambda self: int(self.store.array['y'][self.row]))
+    width = property(lambda self: int(self.store.array['width'][self.row]))
+    height = property(lambda self: int(self.store.array['height'][self.row]))
+
+class ClaimStore:
+    """
+    Claims stored as one structured np.array of int64 fields, 40 bytes per
+    claim. Indexing a row gives a ClaimView, and slicing gives another
+    ClaimStore sharing the same memory
+    """
+    def __init__(self, array):
+        self.array = array
+
+    @staticmethod
+    def from_table(table):
+        """
+        Store the rows of an np.array of shape (number of claims, 5), without
+        copying it if it is already a contiguous array of int64
+        """
+        import numpy as np
+
+        dtype = np.dtype([(field, np.int64) for field in CLAIM_FIELDS])
+        table = np.ascontiguousarray(table, dtype=np.int64).reshape(-1, 5)
+
+        return ClaimStore(table.view(dtype)[:, 0])
+
+    @staticmethod
+    def from_claims(claims):
+        """
+        Store a list of Claims
+        """
+        import numpy as np
+
+        return ClaimStore.from_table(np.column_stack(claim_columns(claims)))
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return ClaimStore(self.array[row])
+        if row < 0:
+            row += len(self.array)
+        if not 0 <= row < len(self.array):
+            raise IndexError('claim row out of range')
+
+        return ClaimView(self, row)
+
+    def __iter__(self):
+        return (ClaimView(self, row) for row in range(len(self.array)))
+
+    def columns(self):
+        """
+        Views of the idx, x, y, width and height of every claim
+        """
+        return tuple(self.array[field] for field in CLAIM_FIELDS)
+
 def convert_strings_to_claims(lines):
     """
-    Convert list of strings into Claim objects
+    Convert list of strings into a ClaimStore. A LineFile is parsed in chunks
+    straight from its file, or loaded if it was parsed on a previous run
 
     Input:
-    - lines: list of strings
+    - lines: list of strings, or a LineFile
     
     Returns:
-    - list of Claims
+    - ClaimStore
     """
-    pattern = r'#(\d+) @ (\d+),(\d+): (\d+)x(\d+)'
-    temp = [re.findall(pattern, line)[0] for line in lines]
-    return [Claim(*x) for x in temp]
+    # Every number in a claim is a field: '#idx @ x,y: widthxheight'
+    filename = getattr(lines, 'filename', None)
+    if filename is not None:
+        table = utils.load_numbers(filename, 5, signed=False)
+    else:
+        table = utils.parse_numbers(lines, 5, signed=False)
 
-def count_overlap(claims):
+    return ClaimStore.from_table(table)
+
+def claim_columns(claims):
     """
-    Count number of overlapping square inches of fabric
+    Gather the fields of claims into arrays
 
     Input:
-    - claims: list of Claims
+    - claims: ClaimStore, or list of Claims
 
     Returns:
-    - number of overlapping square inches described by the Claims
+    - tuple of np.arrays of idx, x, y, width and height
+    """
+    import numpy as np
+
+    if isinstance(claims, ClaimStore):
+        return claims.columns()
+
+    return tuple(np.fromiter((getattr(claim, field) for claim in claims),
+            dtype=np.int64, count=len(claims))
+            for field in CLAIM_FIELDS)
+
+def choose_engine(columns):
+    """
+    Choose how to analyze claims from their bounding box and density
+
+    The grid engine does a few operations per square inch of the bounding
+    box, and the sweep engine a few hundred per claim and log of the number of
+    claims. The grid is used when the claims are dense enough for it to be
+    faster, unless it would not fit in memory.
+
+    Input:
+    - columns: tuple of np.arrays from claim_columns
+
+    Returns:
+    - 'grid' or 'sweep'
+    """
+    import math
+
+    idx, x, y, width, height = columns
+    area = (int((x + width).max() - x.min())
+            * int((y + height).max() - y.min()))
+
+    budget = GRID_CELLS_PER_CLAIM * len(idx) * max(1.0, math.log2(len(idx)))
+    if area <= GRID_CELL_LIMIT and area <= budget:
+        return 'grid'
+
+    return 'sweep'
+
+def analyze_grid(columns):
+    """
+    Find overlapping square inches and claims with a dense grid
+
+    Each claim adds 1 inside its rectangle to a 2D difference array with four
+    corner updates, and cumulative sums along both axes recover the number of
+    claims on each square inch. A summed-area table of the overlapping square
+    inches then tells whether each claim overlaps with another in O(1).
+
+    Input:
+    - columns: tuple of np.arrays from claim_columns, with at least one claim
+
+    Returns:
+    - tuple of:
+        - number of overlapping square inches described by the Claims
+        - np.array of booleans, True for claims that do not overlap any others
+    """
+    import numpy as np
+
+    idx, x, y, width, height = columns
+
+    # Only the bounding box of the claims is stored
+    x = x - x.min()
+    y = y - y.min()
+    right = x + width
+    bottom = y + height
+    grid_width = int(right.max())
+    grid_height = int(bottom.max())
+
+    diff = np.zeros((grid_height + 1, grid_width + 1), dtype=np.int32)
+    np.add.at(diff, (y, x), 1)
+    np.add.at(diff, (y, right), -1)
+    np.add.at(diff, (bottom, x), -1)
+    np.add.at(diff, (bottom, right), 1)
+
+    # Number of claims describing each coordinate
+    counts = diff.cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)
+    counts = counts[:grid_height, :grid_width]
+    overlap = counts > 1
+    num_overlap = int(np.count_nonzero(overlap))
+
+    # Summed-area table of overlapping coordinates, with a row and column of
+    # zeros at the top and left
+    table = np.zeros((grid_height + 1, grid_width + 1), dtype=np.int64)
+    overlap.cumsum(axis=0, out=table[1:, 1:])
+    table[1:, 1:].cumsum(axis=1, out=table[1:, 1:])
+
+    num_overlapping = (table[bottom, right] - table[y, right]
+            - table[bottom, x] + table[y, x])
+
+    return num_overlap, num_overlapping == 0
+
+class CoverageTree:
+    """
+    Segment tree over the gaps between sorted coordinates, tracking how much
+    of any range is covered by at least one and at least two intervals
+
+    Intervals are only ever added to the nodes that exactly cover them, so no
+    update needs to be pushed down to the children.
+    """
+    def __init__(self, coords):
+        self.coords = coords
+        size = 4 * max(1, len(coords) - 1)
+        self.count = [0] * size # intervals covering the whole node
+        self.once = [0] * size # length covered at least once in the subtree
+        self.twice = [0] * size # length covered at least twice in the subtree
+
+    def pull(self, node, lo, hi):
+        if self.count[node] >= 2:
+            self.once[node] = self.twice[node] = self.coords[hi] - self.coords[lo]
+        elif hi - lo == 1:
+            self.once[node] = (self.coords[hi] - self.coords[lo]
+                    if self.count[node] == 1 else 0)
+            self.twice[node] = 0
+        elif self.count[node] == 1:
+            self.once[node] = self.coords[hi] - self.coords[lo]
+            self.twice[node] = self.once[2*node] + self.once[2*node+1]
+        else:
+            self.once[node] = self.once[2*node] + self.once[2*node+1]
+            self.twice[node] = self.twice[2*node] + self.twice[2*node+1]
+
+    def add(self, start, end, delta, node=1, lo=0, hi=None):
+        """
+        Add delta to the number of intervals covering gaps start to end
+        """
+        hi = len(self.coords) - 1 if hi is None else hi
+        if end <= lo or hi <= start:
+            return
+
+        if start <= lo and hi <= end:
+            self.count[node] += delta
+        else:
+            mid = (lo + hi) // 2
+            self.add(start, end, delta, 2*node, lo, mid)
+            self.add(start, end, delta, 2*node+1, mid, hi)
+
+        self.pull(node, lo, hi)
+
+    def covered(self, start, end, node=1, lo=0, hi=None):
+        """
+        Check if any of gaps start to end is covered by an interval
+        """
+        hi = len(self.coords) - 1 if hi is None else hi
+        if end <= lo or hi <= start:
+            return False
+        if self.count[node] > 0:
+            return True
+        if start <= lo and hi <= end:
+            return self.once[node] > 0
+
+        mid = (lo + hi) // 2
+        return (self.covered(start, end, 2*node, lo, mid)
+                or self.covered(start, end, 2*node+1, mid, hi))
+
+class IntervalTree:
+    """
+    Segment tree over gaps between sorted coordinates, storing intervals at
+    the nodes that exactly cover them, to find every stored interval
+    intersecting a range
+    """
+    def __init__(self, num_gaps):
+        self.num_gaps = num_gaps
+        size = 4 * max(1, num_gaps)
+        self.items = [None] * size # set of intervals stored at each node
+        self.size = [0] * size # number of intervals stored in the subtree
+
+    def update(self, item, start, end, add, node=1, lo=0, hi=None):
+        """
+        Store or remove an item covering gaps start to end
+        """
+        hi = self.num_gaps if hi is None else hi
+        if end <= lo or hi <= start:
+            return
+
+        if start <= lo and hi <= end:
+            if add:
+                if self.items[node] is None:
+                    self.items[node] = set()
+                self.items[node].add(item)
+            else:
+                self.items[node].discard(item)
+        else:
+            mid = (lo + hi) // 2
+            self.update(item, start, end, add, 2*node, lo, mid)
+            self.update(item, start, end, add, 2*node+1, mid, hi)
+
+        self.size[node] += 1 if add else -1
+
+    def intersecting(self, start, end, found, node=1, lo=0, hi=None):
+        """
+        Add every stored item intersecting gaps start to end to found
+        """
+        hi = self.num_gaps if hi is None else hi
+        if end <= lo or hi <= start or self.size[node] == 0:
+            return
+
+        # Items of a node cover all of it, so they all intersect the range
+        if self.items[node]:
+            found.update(self.items[node])
+
+        if hi - lo > 1:
+            mid = (lo + hi) // 2
+            self.intersecting(start, end, found, 2*node, lo, mid)
+            self.intersecting(start, end, found, 2*node+1, mid, hi)
+
+def analyze_sweep(columns):
+    """
+    Find overlapping square inches and claims with a sweep line
+
+    A vertical line sweeps the claims from left to right. The claims it
+    crosses are kept in a segment tree over the compressed y-coordinates,
+    which measures how much of the line is covered twice, and whether a new
+    claim crosses any of them. A second tree holds the crossed claims not yet
+    known to overlap, so that a new claim finds those it overlaps directly.
+    Time is O(n log n) and memory O(n), whatever the size of the fabric.
+
+    Input:
+    - columns: tuple of np.arrays from claim_columns, with at least one claim
+
+    Returns:
+    - tuple of:
+        - number of overlapping square inches described by the Claims
+        - np.array of booleans, True for claims that do not overlap any others
     """
-    # Store number of claims describing each coordinate
-    squares = {}
+    import numpy as np
+
+    idx, x, y, width, height = columns
+    alone = np.ones(len(idx), dtype=bool)
 
-    for claim in claims:
-        for i in range(claim.width):
-            for j in range(claim.height):
-                coord = (claim.x + i, claim.y + j)
+    # Empty claims cover nothing and never overlap
+    claims = np.flatnonzero((width > 0) & (height > 0)).tolist()
+    left, right = x.tolist(), (x + width).tolist()
+    top, bottom = y.tolist(), (y + height).tolist()
 
-                if coord in squares:
-                    squares[coord] += 1
-                else:
-                    squares[coord] = 1
+    coords = sorted(set(top[i] for i in claims) | set(bottom[i] for i in claims))
+    position = {coord: i for i, coord in enumerate(coords)}
+    coverage = CoverageTree(coords)
+    unmarked = IntervalTree(len(coords) - 1)
+
+    # Claims ending at a coordinate leave before those starting there enter
+    events = sorted([(right[i], 0, i) for i in claims]
+            + [(left[i], 1, i) for i in claims])
 
-    # Count number of coordinates with overlapping claims
     num_overlap = 0
+    prev_x = events[0][0] if events else 0
+
+    for curr_x, starts, i in events:
+        num_overlap += coverage.twice[1] * (curr_x - prev_x)
+        prev_x = curr_x
+
+        start, end = position[top[i]], position[bottom[i]]
+
+        if not starts:
+            coverage.add(start, end, -1)
+            if alone[i]:
+                unmarked.update(i, start, end, False)
+            continue
+
+        if coverage.covered(start, end):
+            alone[i] = False
 
-    for coord in squares:
-        if squares[coord] > 1:
-            num_overlap += 1
+            # Mark the crossed claims this one overlaps
+            found = set()
+            unmarked.intersecting(start, end, found)
+            for j in found:
+                alone[j] = False
+                unmarked.update(j, position[top[j]], position[bottom[j]], False)
 
-    return num_overlap
+        coverage.add(start, end, 1)
+        if alone[i]:
+            unmarked.update(i, start, end, True)
+
+    return num_overlap, alone
+
+def find_overlaps(claims, engine=None):
+    """
+    Count overlapping square inches and find every claim that does not
+    overlap with any others
+
+    Input:
+    - claims: ClaimStore, or list of Claims
+    - engine: 'grid' (analyze_grid) or 'sweep' (analyze_sweep). Default is
+        None, which lets choose_engine decide
+
+    Returns:
+    - tuple of:
+        - number of overlapping square inches described by the Claims
+        - np.array of the idx of every claim that does not overlap any others
+    """
+    import numpy as np
+
+    columns = claim_columns(claims)
+    if len(columns[0]) == 0:
+        return 0, np.zeros(0, dtype=np.int64)
+
+    if engine is None:
+        engine = choose_engine(columns)
+
+    if engine == 'grid':
+        num_overlap, alone = analyze_grid(columns)
+    elif engine == 'sweep':
+        num_overlap, alone = analyze_sweep(columns)
+    else:
+        raise ValueError('unknown engine %r' % engine)
+
+    return num_overlap, columns[0][alone]
+
+def analyze_claims(claims, engine=None):
+    """
+    Count overlapping square inches and find the claim that does not overlap
+    with any others, in a single pass
+
+    Input:
+    - claims: ClaimStore, or list of Claims
+    - engine: 'grid' or 'sweep'. Default is None, which lets choose_engine
+        decide
+
+    Returns:
+    - tuple of:
+        - number of overlapping square inches described by the Claims
+        - index of the first claim that does not overlap with any others
+            -1 if no claim was found
+    """
+    num_overlap, alone = find_overlaps(claims, engine)
+
+    return num_overlap, int(alone[0]) if len(alone) > 0 else -1
+
+def count_overlap(claims):
+    """
+    Count number of overlapping square inches of fabric
+
+    Input:
+    - claims: ClaimStore, or list of Claims
+
+    Returns:
+    - number of overlapping square inches described by the Claims
+    """
+    return analyze_claims(claims)[0]
 
 def find_non_overlap(claims):
     """
     Find the claim that does not overlap with any others
 
     Input:
-    - claims: list of Claims
+    - claims: ClaimStore, or list of Claims
 
     Returns:
     - index of the claim that does not overlap with any others
         -1 if no claim was found
     """
-    # Store last occupying claim at each coordinate
-    squares = {}
+    return analyze_claims(claims)[1]
+
+class ClaimIndex:
+    """
+    Mutable set of claims keeping the overlapping area up to date
+
+    The fabric is cut into square buckets of BUCKET_SIZE inches. Every bucket
+    covered by a claim holds the number of claims on each of its square
+    inches and the claims covering part of it, so adding or removing a claim
+    only touches the buckets it covers, and memory grows with the claimed
+    area rather than with the coordinates of the claims.
+    """
+    BUCKET_SIZE = 64
+
+    def __init__(self, claims=()):
+        self.num_overlap = 0
+
+        # key: idx of a claim
+        # value: Claim
+        self.claims = {}
+
+        # key: (column, row) of a bucket
+        # value: set of idx of claims covering part of the bucket
+        self.buckets = {}
+
+        # key: (column, row) of a bucket
+        # value: np.array of the number of claims on each square inch
+        self.tiles = {}
+
+        for claim in claims:
+            self.add_claim(claim)
+
+    def __len__(self):
+        return len(self.claims)
+
+    def __contains__(self, idx):
+        return idx in self.claims
+
+    def bucket_keys(self, x, y, width, height):
+        """
+        Keys of the buckets covering part of a rectangle
+        """
+        if width <= 0 or height <= 0:
+            return []
+
+        size = self.BUCKET_SIZE
+        return [(column, row)
+                for row in range(y // size, (y + height - 1) // size + 1)
+                for column in range(x // size, (x + width - 1) // size + 1)]
+
+    def tile_regions(self, claim):
+        """
+        Lazily yield the key of every bucket covered by a claim, with a view
+        of the counts of the square inches of the claim in its tile. Tiles
+        are created as needed
+        """
+        import numpy as np
+
+        size = self.BUCKET_SIZE
+
+        for key in self.bucket_keys(claim.x, claim.y, claim.width,
+                claim.height):
+            if key not in self.tiles:
+                self.tiles[key] = np.zeros((size, size), dtype=np.int32)
+
+            left = key[0] * size
+            top = key[1] * size
+            yield key, self.tiles[key][
+                    max(claim.y - top, 0):min(claim.y + claim.height - top, size),
+                    max(claim.x - left, 0):min(claim.x + claim.width - left, size)]
+
+    def add_claim(self, claim):
+        """
+        Add a claim to the index
+
+        Input:
+        - claim: Claim, whose idx is not in the index yet
+        """
+        if claim.idx in self.claims:
+            raise ValueError('claim %d is already in the index' % claim.idx)
+
+        for key, region in self.tile_regions(claim):
+            # Square inches claimed once so far become overlapping
+            self.num_overlap += int((region == 1).sum())
+            region += 1
+            self.buckets.setdefault(key, set()).add(claim.idx)
+
+        self.claims[claim.idx] = claim
+
+    def remove_claim(self, idx):
+        """
+        Remove a claim from the index
+
+        Input:
+        - idx: index of the claim to remove
+
+        Returns:
+        - removed Claim
+        """
+        claim = self.claims.pop(idx)
+
+        for key, region in self.tile_regions(claim):
+            # Square inches claimed twice so far stop overlapping
+            self.num_overlap -= int((region == 2).sum())
+            region -= 1
+
+            # A bucket no claim covers only holds zeros
+            bucket = self.buckets[key]
+            bucket.discard(idx)
+            if not bucket:
+                del self.buckets[key]
+                del self.tiles[key]
+
+        return claim
+
+    def overlap_area(self):
+        """
+        Number of square inches of fabric claimed more than once
+        """
+        return self.num_overlap
 
-    # Store overlap status of each claim
-    overlap_statuses = {}
+    def claims_overlapping(self, rect):
+        """
+        Find the claims overlapping a rectangle
 
-    for claim in claims:
-        overlap_statuses[claim.idx] = False
+        Input:
+        - rect: Claim, or tuple of (x, y, width, height)
 
-        for i in range(claim.width):
-            for j in range(claim.height):
-                coord = (claim.x + i, claim.y + j)
+        Returns:
+        - sorted list of idx of the claims sharing at least a square inch with
+            rect. A Claim of the index is not reported as overlapping itself
+        """
+        if isinstance(rect, (Claim, ClaimView)):
+            x, y, width, height = rect.x, rect.y, rect.width, rect.height
+            own = rect.idx
+        else:
+            x, y, width, height = rect
+            own = None
 
-                if coord in squares:
-                    # Mark previously occupying claim as overlapping
-                    overlap_statuses[squares[coord]] = True
+        candidates = set()
+        for key in self.bucket_keys(x, y, width, height):
+            candidates.update(self.buckets.get(key, ()))
+        candidates.discard(own)
 
-                    # Mark current claim as overlapping
-                    overlap_statuses[claim.idx] = True
+        found = []
+        for idx in candidates:
+            claim = self.claims[idx]
+            if (claim.x < x + width and x < claim.x + claim.width
+                    and claim.y < y + height and y < claim.y + claim.height):
+                found.append(idx)
 
-                # Assign idx of current claim to this coordinate
-                squares[coord] = claim.idx
+        return sorted(found)
 
-    # Find the first claim that does not overlap with any others
-    for idx in overlap_statuses:
-        if not overlap_statuses[idx]:
-            return idx
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    return count_overlap(convert_strings_to_claims(lines))
 
-    return -1
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    return find_non_overlap(convert_strings_to_claims(lines))
 
 if __name__ == '__main__':
-    lines = utils.read_lines_from_file('input.txt')
+    lines = utils.LineFile('input.txt')
     claims = convert_strings_to_claims(lines)
-    print(count_overlap(claims))
-    print(find_non_overlap(claims))
+    num_overlap, non_overlap = analyze_claims(claims)
+    print(num_overlap)
+    print(non_overlap)
@@ -1,9 +1,117 @@
 #!/usr/bin/python
 
-import re
+import array
+import heapq
+import os
+import tempfile
 
 import utils
 
+# Fixed-width start of each record, where every 0 stands for a digit. The
+# event follows: 'Guard #id begins shift', 'falls asleep' or 'wakes up'
+RECORD_PREFIX = b'[0000-00-00 00:00] '
+
+GUARD_PATTERN = r'#(\d+)'
+
+# Events other than a guard beginning a shift, whose event is the guard ID
+FALLS_ASLEEP = -1
+WAKES_UP = -2
+
+MINUTES_PER_DAY = 24 * 60
+
+# Number of bytes of records parsed and sorted in memory at a time when
+# merging files
+RUN_SIZE = 1 << 22
+
+# Number of naps added to the sleep matrix at a time
+NAPS_PER_UPDATE = 1 << 12
+
+# Largest number of sorted runs open at the same time when merging
+RUNS_PER_MERGE = 128
+
+# Number of events read back at a time from a sorted run
+EVENTS_PER_READ = 1 << 12
+
+def parse_events(data):
+    '''
+    Parse every record of an input at once into events
+
+    Input:
+    - data: bytes-like object, string, or iterable of records
+
+    Output:
+    - np.array of int64 of shape (number of records, 2) of:
+        - timestamp in minutes since 1970-01-01 00:00
+        - guard ID for a guard beginning a shift, FALLS_ASLEEP or WAKES_UP
+    '''
+    import numpy as np
+
+    if isinstance(data, str):
+        data = data.encode()
+    elif not isinstance(data, (bytes, bytearray, memoryview)):
+        data = '\n'.join(data).encode()
+
+    # Start of every record, skipping blank lines
+    raw = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(raw == ord('\n'))
+    starts = np.concatenate(([0], newlines + 1))
+    stops = np.concatenate((newlines, [len(raw)]))
+    is_record = stops > starts
+    starts, stops = starts[is_record], stops[is_record]
+
+    # Read the prefix of every record at once, and check it against the
+    # template, which also ensures each record has an event after it
+    width = len(RECORD_PREFIX) + 1
+    if np.any(stops - starts < width):
+        raise ValueError('Invalid record.')
+    prefixes = raw[starts[:, np.newaxis] + np.arange(width)]
+
+    template = np.frombuffer(RECORD_PREFIX, dtype=np.uint8)
+    is_digit = template == ord('0')
+    digits = prefixes[:, :-1][:, is_digit].astype(np.int64) - ord('0')
+    if (np.any(prefixes[:, :-1][:, ~is_digit] != template[~is_digit])
+            or np.any((digits < 0) | (digits > 9))):
+        raise ValueError('Invalid record.')
+
+    # Fields of the timestamp: 4 digits of the year, then 2 digits each
+    fields = []
+    for first, stop in ((0, 4), (4, 6), (6, 8), (8, 10), (10, 12)):
+        field = digits[:, first]
+        for i in range(first + 1, stop):
+            field = field * 10 + digits[:, i]
+        fields.append(field)
+    year, month, day, hour, minute = fields
+
+    # Count days with calendar arithmetic on dates
+    dates = ((year - 1970).astype('datetime64[Y]').astype('datetime64[M]')
+            + (month - 1)).astype('datetime64[D]') + (day - 1)
+
+    kinds = prefixes[:, -1]
+    if np.any((kinds != ord('G')) & (kinds != ord('f')) & (kinds != ord('w'))):
+        raise ValueError('Invalid record.')
+
+    events = np.empty((len(starts), 2), dtype=np.int64)
+    events[:, 0] = (dates.astype(np.int64) * MINUTES_PER_DAY + hour * 60
+            + minute)
+    events[:, 1] = np.where(kinds == ord('f'), FALLS_ASLEEP, WAKES_UP)
+
+    # Guard IDs appear in the same order as the records beginning a shift
+    is_guard = kinds == ord('G')
+    guards = utils.parse_table(GUARD_PATTERN, data, dtype='int64')[:, 0]
+    if len(guards) != np.count_nonzero(is_guard):
+        raise ValueError('Invalid record.')
+    events[is_guard, 1] = guards
+
+    return events
+
+def sort_events(events):
+    '''
+    Sort events from parse_events in chronological order
+    '''
+    import numpy as np
+
+    return events[np.lexsort((events[:, 1], events[:, 0]))]
+
 def sort_records(records):
     '''
     Sort records in chronological order
@@ -14,106 +122,289 @@ def sort_records(records):
     Output:
     - list of records in chronological order
     '''
-    pattern = r'\[(.*)\]'
-    return sorted(records, key=lambda record: re.findall(pattern, record)[0])
+    import numpy as np
 
-def count_sleep(records):
+    records = list(records)
+    order = np.argsort(parse_events(records)[:, 0], kind='stable')
+    return [records[i] for i in order.tolist()]
+
+def write_run(events, filename):
+    '''
+    Sort events and save them as pairs of int64
+
+    Inputs:
+    - events: np.array from parse_events
+    - filename: name of the file to write to
+    '''
+    sort_events(events).tofile(filename)
+
+def iter_run(filename):
+    '''
+    Lazily yield the events saved by write_run, in order
+    '''
+    with open(filename, 'rb') as f:
+        while True:
+            block = array.array('q')
+            try:
+                block.fromfile(f, 2 * EVENTS_PER_READ)
+            except EOFError:
+                pass # last, partial block
+
+            if not block:
+                break
+
+            yield from zip(block[::2], block[1::2])
+
+def write_merged(run_names, filename):
+    '''
+    Merge sorted runs into a single run, EVENTS_PER_READ events at a time
+
+    Inputs:
+    - run_names: list of names of files saved by write_run
+    - filename: name of the file to write to
+    '''
+    with open(filename, 'wb') as f:
+        block = array.array('q')
+
+        for event in heapq.merge(*[iter_run(name) for name in run_names]):
+            block.extend(event)
+            if len(block) >= 2 * EVENTS_PER_READ:
+                block.tofile(f)
+                block = array.array('q')
+
+        block.tofile(f)
+
+def merge_events(filenames, run_size=RUN_SIZE, runs_per_merge=RUNS_PER_MERGE):
     '''
-    Count the minutes that each guard spends asleep
+    Lazily yield the events of several files in chronological order. Each
+    file is parsed and sorted in runs of run_size bytes, which are saved to
+    temporary files and merged, so only one run is ever held in memory.
+    While there are more than runs_per_merge runs, groups of that many are
+    merged into longer runs first, so no more files are ever open at once
+
+    Inputs:
+    - filenames: list of names of files of records, in any order
+    - run_size: number of bytes of records parsed and sorted in memory at a
+      time. Default is RUN_SIZE
+    - runs_per_merge: largest number of runs merged at the same time. Default
+      is RUNS_PER_MERGE
+
+    Output:
+    - generator of (timestamp, event) tuples, see parse_events
+    '''
+    with tempfile.TemporaryDirectory() as run_dir:
+        run_names = []
+        num_runs = 0
+
+        for filename in filenames:
+            for chunk in utils.iter_chunks(filename, run_size, b'\n'):
+                events = parse_events(chunk)
+                if len(events) == 0:
+                    continue
+
+                run_names.append(os.path.join(run_dir, '%d' % num_runs))
+                num_runs += 1
+                write_run(events, run_names[-1])
+
+        while len(run_names) > runs_per_merge:
+            merged_names = []
+
+            for first in range(0, len(run_names), runs_per_merge):
+                group = run_names[first:first + runs_per_merge]
+                merged_names.append(os.path.join(run_dir, '%d' % num_runs))
+                num_runs += 1
+                write_merged(group, merged_names[-1])
+
+                for name in group:
+                    os.remove(name)
+
+            run_names = merged_names
+
+        yield from heapq.merge(*[iter_run(name) for name in run_names])
+
+def add_naps(diff, num_guards, rows, starts, durations):
+    '''
+    Add naps to the difference array of count_sleep_events
+
+    Each nap adds one to a range of two days of minutes, which is later
+    folded back onto a single day, so naps across midnight need no splitting.
+    Naps of a day or more also cover the whole first day once per full day.
+
+    Inputs:
+    - diff: np.array of int32 of shape (rows, 2 * MINUTES_PER_DAY + 1)
+    - num_guards: number of guards that fell asleep so far
+    - rows, starts, durations: lists of the row of the guard, timestamp and
+      duration of each nap
+
+    Output:
+    - diff, grown to at least num_guards rows if needed
+    '''
+    import numpy as np
+
+    if num_guards > len(diff):
+        grown = np.zeros((max(num_guards, 2 * len(diff)), diff.shape[1]),
+                dtype=np.int32)
+        grown[:len(diff)] = diff
+        diff = grown
+
+    rows = np.array(rows, dtype=np.int64)
+    starts = np.array(starts, dtype=np.int64) % MINUTES_PER_DAY
+    full_days, rest = np.divmod(np.array(durations, dtype=np.int64),
+            MINUTES_PER_DAY)
+    full_days = full_days.astype(np.int32)
+
+    np.add.at(diff, (rows, starts), 1)
+    np.add.at(diff, (rows, starts + rest), -1)
+    np.add.at(diff, (rows, 0), full_days)
+    np.add.at(diff, (rows, MINUTES_PER_DAY), -full_days)
+
+    return diff
+
+def count_sleep_events(events):
+    '''
+    Count the times that each guard spends asleep at each minute of the day.
+    Naps may last any number of minutes and span midnight. Naps are added to
+    a difference array NAPS_PER_UPDATE at a time, so memory depends on the
+    number of guards rather than on the number of events
 
     Input:
-    - records: list of records of guard activity
+    - events: iterable of (timestamp, event) pairs from parse_events, in
+      chronological order
 
     Output:
     - tuple of:
-        - dictionary of total number of minutes spent asleep for each guard
-            key: guard ID
-            value: total number of minutes spent asleep
-        - dictionary of specific minutes spent asleep for each guard
-            key: guard ID
-            value: dictionary containing number of times spent asleep for each
-            minute of the hour
+        - np.array of the ID of every guard that fell asleep, in the order
+          they first did
+        - np.array of int32 of shape (number of guards, MINUTES_PER_DAY),
+          number of times each guard was asleep at each minute of the day
     '''
-    total_minutes = {} # total number of minutes spent asleep for each guard
-    
-    minutes_asleep = {} # specific minutes spent asleep for each guard
+    import numpy as np
+
+    # key: guard ID
+    # value: row of the guard in the matrix
+    rows = {}
+
+    diff = np.zeros((0, 2 * MINUTES_PER_DAY + 1), dtype=np.int32)
 
-    sorted_records = sort_records(records)
+    # Row, timestamp and duration of the naps not added to diff yet
+    nap_rows = []
+    nap_starts = []
+    nap_durations = []
 
     curr_guard = -1
     start_sleep = -1
     is_asleep = False
 
-    for record in sorted_records:
-        if 'Guard' in record:
-            curr_guard = int(re.findall(r'#(\d+)', record)[0])
+    for timestamp, event in events:
+        if event >= 0:
+            curr_guard = event
             is_asleep = False
-        elif 'falls' in record:
+        elif event == FALLS_ASLEEP:
             if curr_guard != -1:
-                # Always midnight hour (00), so only the minutes matter
-                start_sleep = int(re.findall(r':(\d\d)', record)[0])
+                start_sleep = timestamp
                 is_asleep = True
             else:
                 raise ValueError('No guard is at the post.')
-        elif 'wakes' in record:
-            if is_asleep:
-                # Always midnight hour (00), so only the minutes matter
-                end_sleep = int(re.findall(r':(\d\d)', record)[0])
-
-                # Add to total number of minutes spent asleep
-                duration = end_sleep - start_sleep
-                if curr_guard in total_minutes:
-                    total_minutes[curr_guard] += duration
-                else:
-                    total_minutes[curr_guard] = duration
-
-                # Keep track of specific minutes spent asleep
-                if curr_guard not in minutes_asleep:
-                    # Create new dictionary to store specific minutes
-                    minutes_asleep[curr_guard] = {}
-
-                for i in range(start_sleep, end_sleep):
-                    if i in minutes_asleep[curr_guard]:
-                        minutes_asleep[curr_guard][i] += 1
-                    else:
-                        minutes_asleep[curr_guard][i] = 1
-            else:
-                raise ValueError('Guard is already awake.')
+        elif is_asleep:
+            nap_rows.append(rows.setdefault(curr_guard, len(rows)))
+            nap_starts.append(start_sleep)
+            nap_durations.append(timestamp - start_sleep)
+            is_asleep = False
+
+            if len(nap_rows) == NAPS_PER_UPDATE:
+                diff = add_naps(diff, len(rows), nap_rows, nap_starts,
+                        nap_durations)
+                del nap_rows[:], nap_starts[:], nap_durations[:]
+        else:
+            raise ValueError('Guard is already awake.')
 
-    return (total_minutes, minutes_asleep)
+    diff = add_naps(diff, len(rows), nap_rows, nap_starts, nap_durations)
+    days = diff[:len(rows)].cumsum(axis=1, dtype=np.int32)
+    matrix = days[:, :MINUTES_PER_DAY] + days[:, MINUTES_PER_DAY:-1]
 
-def find_greatest_quantity_slept(total_minutes, minutes_asleep):
+    return np.array(list(rows), dtype=np.int64), matrix
+
+def count_sleep(records):
+    '''
+    Count the minutes that each guard spends asleep, from records held in
+    memory. See count_sleep_events for the output
+    '''
+    return count_sleep_events(sort_events(parse_events(records)).tolist())
+
+def count_sleep_from_files(filenames, run_size=RUN_SIZE,
+        runs_per_merge=RUNS_PER_MERGE):
+    '''
+    Count the minutes that each guard spends asleep, from records split
+    across files too large to hold in memory. See merge_events for the inputs
+    and count_sleep_events for the output
+    '''
+    return count_sleep_events(merge_events(filenames, run_size,
+            runs_per_merge))
+
+def find_greatest_quantity_slept(guard_ids, matrix):
     '''
     Solve part one
     '''
-    # Find ID of guard with the most minutes spent asleep
-    max_id = max(total_minutes, key=total_minutes.get)
+    # Find the guard with the most minutes spent asleep
+    row = matrix.sum(axis=1).argmax()
 
     # Find the specific minute in which the guard spent the most time asleep
-    max_minute = max(minutes_asleep[max_id], key=minutes_asleep[max_id].get)
-
-    return max_id * max_minute
+    return int(guard_ids[row]) * int(matrix[row].argmax())
 
-def find_greatest_frequency_slept(minutes_asleep):
+def find_greatest_frequency_slept(guard_ids, matrix):
     '''
     Solve part two
     '''
-    max_guard = -1
-    max_minute = -1
-    max_freq = -1
+    import numpy as np
+
+    row, minute = np.unravel_index(matrix.argmax(), matrix.shape)
+    return int(guard_ids[row]) * int(minute)
+
+def sleepiest_guards(guard_ids, matrix, k, start=0, stop=MINUTES_PER_DAY):
+    '''
+    Find the guards that spent the most time asleep in a range of minutes
+
+    Inputs:
+    - guard_ids, matrix: output of count_sleep_events
+    - k: number of guards to find
+    - start, stop: range of minutes of the day, stop excluded. Default is the
+      whole day
+
+    Output:
+    - list of up to k (guard ID, minutes asleep in the range) tuples, from the
+      sleepiest guard
+    '''
+    import numpy as np
 
-    for guard in minutes_asleep:
-        for minute in minutes_asleep[guard]:
-            if minutes_asleep[guard][minute] > max_freq:
-                max_guard = guard
-                max_minute = minute
-                max_freq = minutes_asleep[guard][minute]
+    totals = matrix[:, start:stop].sum(axis=1, dtype=np.int64)
+    rows = np.argsort(-totals, kind='stable')[:k]
 
-    return max_guard * max_minute
+    return list(zip(guard_ids[rows].tolist(), totals[rows].tolist()))
+
+def count_sleep_in(lines):
+    '''
+    Count the minutes that each guard spends asleep, merging the records
+    straight from the file of a LineFile
+    '''
+    filename = getattr(lines, 'filename', None)
+    if filename is not None:
+        return count_sleep_from_files([filename])
+
+    return count_sleep(lines)
+
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    return find_greatest_quantity_slept(*count_sleep_in(lines))
+
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    return find_greatest_frequency_slept(*count_sleep_in(lines))
 
 if __name__ == '__main__':
-    lines = utils.read_lines_from_file('input.txt')
-    count_out = count_sleep(lines)
+    count_out = count_sleep_from_files(['input.txt'])
     print(find_greatest_quantity_slept(*count_out))
-    print(find_greatest_frequency_slept(count_out[1]))
-    
+    print(find_greatest_frequency_slept(*count_out))
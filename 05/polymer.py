@@ -1,23 +1,45 @@
 #!/home/kwong/anaconda3/bin/python
 
-from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 import utils
 
-def opposite_polarity(x, y):
+# Length of a reduced polymer above which units are removed in parallel
+PARALLEL_THRESHOLD = 1 << 20
+
+# Number of units of a file reduced by each process
+UNITS_PER_CHUNK = 1 << 24
+
+@utils.instrument
+def reduce_polymer(sequence):
     '''
-    Check if characters x and y are uppercase and lowercase versions of the same
-    letter
+    React polymer such that adjacent units of the same type (same letter) and
+    opposite polarity (one uppercase, the other lowercase) are destroyed
+
+    Units are pushed onto a stack one at a time. A unit reacts with the unit
+    on top of the stack if their ASCII codes differ only in the case bit
+    (XOR 32), so every unit is pushed and popped at most once.
+
+    Input:
+    - sequence: string or bytes containing the sequence of the polymer
 
-    Inputs:
-    - x: a character
-    - y: a character
-    
     Output:
-    - True if x and y are uppercase and lowercase versions of the same letter
-        False otherwise
+    - bytes of the resulting polymer
     '''
-    return abs(ord(x) - ord(y)) == 32
+    if isinstance(sequence, str):
+        sequence = sequence.encode()
+
+    stack = bytearray()
+    push = stack.append
+    pop = stack.pop
+
+    for unit in sequence:
+        if stack and stack[-1] ^ unit == 32:
+            pop()
+        else:
+            push(unit)
+
+    return bytes(stack)
 
 def react_polymer(sequence):
     '''
@@ -25,74 +47,154 @@ def react_polymer(sequence):
     opposite polarity (one uppercase, the other lowercase) are destroyed
 
     Input:
-    - sequence: string containing the sequence of the polymer
+    - sequence: string or bytes containing the sequence of the polymer
 
     Output:
     - number of units in the resulting polymer
     '''
-    # Convert sequence to deque (double-ended queue) of characters
-    remaining_units = deque(sequence)
+    return len(reduce_polymer(sequence))
 
-    # Add 2 units to the working list
-    working_units = deque(remaining_units.popleft())
-    working_units.append(remaining_units.popleft())
+def merge_reduced(left, right):
+    '''
+    React two reduced polymers placed end to end. Only units at the boundary
+    can react, so units cancel in pairs outwards from it
 
-    # Track whether or not the top 2 units react
-    no_reaction = False # The top 2 units may react
+    Inputs:
+    - left: bytes of a reduced polymer
+    - right: bytes of the reduced polymer following it
 
-    while len(remaining_units) > 0 or not no_reaction:
-        if len(working_units) > 1:
-            # Check the top 2 units in the working list
-            y = working_units.pop()
-            x = working_units.pop()
+    Output:
+    - bytes of the reduced polymer
+    '''
+    i = len(left)
+    j = 0
 
-            if not opposite_polarity(x, y):
-                # Add back in the units that were removed to be checked
-                no_reaction = True # The top 2 units did not react
-                working_units.append(x)
-                working_units.append(y)
+    while i > 0 and j < len(right) and left[i-1] ^ right[j] == 32:
+        i -= 1
+        j += 1
 
-                # If possible, add another unit to the top of the working list
-                if len(remaining_units) > 0:
-                    working_units.append(remaining_units.popleft())
-                    no_reaction = False # The top 2 units may react
-        else:
-            # If working list does not have enough units to compare, add
-            # another one if possible
-            if len(remaining_units) > 0:
-                working_units.append(remaining_units.popleft())
-                no_reaction = False # The top 2 units may react
-            else:
-                # Otherwise working list remains too small, and no more
-                # reactions are possible
-                no_reaction = True
+    return left[:i] + right[j:]
 
-    return len(working_units)
+def _reduce_chunk(filename, start, stop):
+    '''
+    Reduce the units of a file from start to stop
+    '''
+    with utils.map_file(filename) as data:
+        return reduce_polymer(data[start:stop])
 
-def find_problem_unit(sequence):
+def reduce_polymer_file(filename, chunk_size=UNITS_PER_CHUNK, num_workers=None):
+    '''
+    React the polymer in a file, too large to hold in memory, in parallel
+
+    The file is memory-mapped and cut into chunks that are reduced by a pool
+    of processes. Reacting is associative, so the reduced chunks are then
+    merged pairwise at their boundaries. Only the reduced chunks are ever
+    held in memory.
+
+    Inputs:
+    - filename: name of the file containing the sequence of the polymer
+    - chunk_size: number of units reduced by each process. Default is
+      UNITS_PER_CHUNK
+    - num_workers: number of processes. Default is None, which uses one per
+      CPU
+
+    Output:
+    - bytes of the resulting polymer
+    '''
+    with utils.map_file(filename) as data:
+        # Ignore the trailing newline
+        size = len(data)
+        while size > 0 and data[size-1:size].isspace():
+            size -= 1
+
+    bounds = [(start, min(start + chunk_size, size))
+            for start in range(0, size, chunk_size)]
+    filenames = [filename] * len(bounds)
+    starts = [start for start, _ in bounds]
+    stops = [stop for _, stop in bounds]
+
+    if len(bounds) > 1 and num_workers != 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            words = list(executor.map(_reduce_chunk, filenames, starts, stops))
+    else:
+        words = list(map(_reduce_chunk, filenames, starts, stops))
+
+    while len(words) > 1:
+        merged = [merge_reduced(left, right)
+                for left, right in zip(words[::2], words[1::2])]
+        if len(words) % 2 == 1:
+            merged.append(words[-1])
+        words = merged
+
+    return words[0] if words else b''
+
+@utils.instrument
+def react_without(sequence, unit):
+    '''
+    React polymer after removing both polarities of a unit
+
+    Inputs:
+    - sequence: bytes containing the sequence of the polymer
+    - unit: uppercase letter of the unit to remove
+
+    Output:
+    - number of units in the resulting polymer
+    '''
+    removed = (unit + unit.lower()).encode()
+    return react_polymer(sequence.translate(None, removed))
+
+def find_problem_unit(sequence, num_workers=None):
     '''
     Find the unit (letter) that, when removed, results in the shortest polymer
 
-    Input:
-    - sequence: string containing the sequence of the polymer
+    Removing a unit never stops other pairs from reacting, so the polymer is
+    reacted once and every unit is removed from the much shorter result.
+    Reduced polymers of more than PARALLEL_THRESHOLD units are shared among a
+    pool of processes.
+
+    Inputs:
+    - sequence: string or bytes containing the sequence of the polymer
+    - num_workers: number of processes. Default is None, which uses one per
+      CPU
 
     Output:
     - number of units in the shortest polymer
     '''
-    min_len = len(sequence) 
+    reduced = reduce_polymer(sequence)
+    units = [chr(i) for i in range(ord('A'), ord('Z')+1)]
+    sequences = [reduced] * len(units)
 
-    for i in range(ord('A'), ord('Z')+1):
-        # Remove instances of both uppercase and lowercase versions of letter
-        new_seq = sequence.replace(chr(i), '').replace(chr(i+32), '')
+    if len(reduced) > PARALLEL_THRESHOLD and num_workers != 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            lengths = list(executor.map(react_without, sequences, units))
+    else:
+        lengths = list(map(react_without, sequences, units))
 
-        length = react_polymer(new_seq)
-        if length < min_len:
-            min_len = length
+    return min(lengths)
 
-    return min_len
+def read_polymer(lines):
+    '''
+    Reduce the polymer of an input, straight from the file of a LineFile
+    '''
+    filename = getattr(lines, 'filename', None)
+    if filename is not None:
+        return reduce_polymer_file(filename)
 
-if __name__ == '__main__':
-    lines = utils.read_lines_from_file('input.txt')
-    print(react_polymer(lines[0]))
-    print(find_problem_unit(lines[0]))
+    return reduce_polymer(next(iter(lines)).strip())
 
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    return len(read_polymer(lines))
+
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    return find_problem_unit(read_polymer(lines))
+
+if __name__ == '__main__':
+    polymer = reduce_polymer_file('input.txt')
+    print(len(polymer))
+    print(find_problem_unit(polymer))
@@ -1,87 +1,96 @@
 #!/usr/bin/python
 
-import re
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import utils
 
-def parse_instruction(inst):
+# Steps may have any name without whitespace
+INSTRUCTION_PATTERN = r'Step (\S+) must be finished before step (\S+) can begin'
+
+def read_instructions(filename):
     '''
-    Parse instruction into a requirement and step
+    Read the requirement and step of every instruction in a file. The parsed
+    pairs are saved the first time, and loaded on later runs on the same file
 
     Input:
-    - inst: string containing requirement and step
+    - filename: name of the file containing instructions
 
     Output:
-    - a tuple of requirement and step
+    - np.array of shape (number of instructions, 2) of requirements and steps
     '''
-    pattern = r'Step ([A-Z]) must be finished before step ([A-Z])'
-    return re.findall(pattern, inst)[0]
+    return utils.load_table(filename, INSTRUCTION_PATTERN)
 
-def build_dictionaries(instructions):
+def build_graph(instructions):
     '''
-    Build dictionaries for requirements and next steps from instructions
+    Number steps in alphabetical order and build the graph of their
+    requirements, with every instruction handled by NumPy at once
 
     Input:
-    - instructions: list of strings containing instructions
+    - instructions: list of strings containing instructions, or pairs from
+      read_instructions
 
     Outputs:
-    - reqs: dictionary of requirements
-        key: name of step
-        value: list of steps that must be completed before taking this one
-    - next_steps: dictionary of next steps
-        key: name of step
-        value: list of steps that can be taken from this one
-    - all_steps: list of all steps
-    '''
-    reqs, next_steps = {}, {}
-    all_steps = []
-
-    for inst in instructions:
-        req, step = parse_instruction(inst)
-
-        # Add step and requirement to all steps
-        if req not in all_steps:
-            all_steps.append(req)
-        if step not in all_steps:
-            all_steps.append(step)
-
-        # Add step to requirements
-        if step in reqs:
-            if req not in reqs[step]:
-                reqs[step].append(req)
-        else:
-            reqs[step] = [req]
-
-        # Add step to next steps
-        if req in next_steps:
-            if step not in next_steps[req]:
-                next_steps[req].append(step)
-        else:
-            next_steps[req] = [step]
-
-    return reqs, next_steps, all_steps
-
-def meets_requirements(next_step, reqs, completed):
-    '''
-    Return whether or not the next step can be taken based on previous steps
+    - names: list of all steps, in alphabetical order
+    - offsets, successors: next steps of step i are
+      successors[offsets[i]:offsets[i+1]], as numbers
+    - num_reqs: list of the number of requirements of each step
+    '''
+    import numpy as np
 
-    Inputs:
-    - next_step: the potential next step
-    - reqs: dictionary of requirements for taking each step
-    - completed: list of completed steps
+    if hasattr(instructions, 'dtype'):
+        pairs = instructions
+    else:
+        pairs = utils.parse_table(INSTRUCTION_PATTERN, instructions)
+
+    names, numbers = np.unique(pairs, return_inverse=True)
+
+    # Sorting the distinct instructions groups them by requirement
+    edges = np.unique(numbers.reshape(-1, 2), axis=0)
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edges[:, 0], minlength=len(names)), out=offsets[1:])
+    num_reqs = np.bincount(edges[:, 1], minlength=len(names))
+
+    return (names.astype(str).tolist(), offsets.tolist(), edges[:, 1].tolist(),
+            num_reqs.tolist())
+
+@utils.instrument
+def topological_order(instructions):
+    '''
+    Determine the order in which steps are completed if available steps are
+    always taken in alphabetical order
+
+    Steps become available once their count of unfinished requirements drops
+    to zero, and are taken from a heap of their numbers in alphabetical
+    order, so the order is found in O(E log V) for E instructions and V steps.
+
+    Input:
+    - instructions: list of strings containing instructions, or pairs from
+      read_instructions
 
     Output:
-    - True if the next step can be taken (all requirements met)
-        False otherwise
+    - list of steps in the order they were taken. Raises ValueError if the
+      requirements contain a cycle
     '''
-    meets_reqs = True
+    names, offsets, successors, num_reqs = build_graph(instructions)
+
+    open_heap = [i for i, count in enumerate(num_reqs) if count == 0]
+    closed_list = []
+
+    while open_heap:
+        step = heapq.heappop(open_heap)
+        closed_list.append(names[step])
 
-    if next_step in reqs:
-        for req in reqs[next_step]:
-            if req not in completed:
-                meets_reqs = False
+        for next_step in successors[offsets[step]:offsets[step+1]]:
+            num_reqs[next_step] -= 1
+            if num_reqs[next_step] == 0:
+                heapq.heappush(open_heap, next_step)
 
-    return meets_reqs
+    if len(closed_list) < len(names):
+        raise ValueError('Requirements of steps contain a cycle.')
+
+    return closed_list
 
 def determine_order(instructions):
     '''
@@ -89,110 +98,268 @@ def determine_order(instructions):
     always taken in alphabetical order
 
     Input:
-    - instructions: list of strings containing instructions
+    - instructions: list of strings containing instructions, or pairs from
+      read_instructions
 
     Output:
     - closed: string containing the order in which steps were taken
     '''
-    reqs, next_steps, all_steps = build_dictionaries(lines)
-    open_list, closed_list = [], []
-
-    # Find possible starting steps
-    for step in all_steps:
-        if step not in reqs:
-            open_list.append(step)
-    open_list.sort()
-
-    while len(open_list) > 0:
-        for i in range(len(open_list)):
-            step = open_list[i]
-
-            if meets_requirements(step, reqs, closed_list):
-                closed_list.append(step)
-                open_list.pop(i)
-
-                # Add next steps to open list 
-                if step in next_steps:
-                    for next_step in next_steps[step]:
-                        if next_step not in open_list:
-                            open_list.append(next_step)
-                    open_list.sort()
-                break
+    return ''.join(topological_order(instructions))
+
+def step_number(step):
+    '''
+    Number of a step: A=1, B=2, ..., Z=26, then AA=27, AB=28, etc. like the
+    columns of a spreadsheet. Other characters are numbered from their code
+    in the same way
+    '''
+    number = 0
+    for letter in step:
+        number = number * 26 + ord(letter) - ord('A') + 1
+
+    return number
+
+def step_duration(step):
+    '''
+    Time to complete a step: 60 seconds + number of seconds corresponding to
+    the step from step_number, and at least 1 second
+    '''
+    return max(step_number(step) + 60, 1)
+
+@utils.instrument
+def schedule_graph(graph, num_workers=1, duration=step_duration):
+    '''
+    Simulate workers taking available steps in alphabetical order
+
+    Rather than ticking every second, the clock jumps to the next time a step
+    is finished, taken from a heap of finish times, so the simulation takes
+    O((E + V) log V) for E instructions and V steps whatever the durations.
+
+    Inputs:
+    - graph: output of build_graph
+    - num_workers: number of workers. Default is 1
+    - duration: function giving the time to complete a step from its name.
+      Default is step_duration
+
+    Output:
+    - list of the steps taken by each worker, as (step, start, finish)
+      tuples in the order they were taken. Raises ValueError if the
+      requirements contain a cycle
+    '''
+    names, offsets, successors, num_reqs = graph
+    num_reqs = list(num_reqs)
+
+    open_heap = [i for i, count in enumerate(num_reqs) if count == 0]
+    free_workers = list(range(num_workers))
+    working_heap = [] # (finish, worker, step) of steps being worked on
+    schedule = [[] for _ in range(num_workers)]
+    num_completed = 0
+    time_elapsed = 0
+
+    while True:
+        # Give available workers steps to complete
+        while open_heap and free_workers:
+            step = heapq.heappop(open_heap)
+            worker = heapq.heappop(free_workers)
+            finish = time_elapsed + duration(names[step])
+
+            schedule[worker].append((names[step], time_elapsed, finish))
+            heapq.heappush(working_heap, (finish, worker, step))
+
+        if not working_heap:
+            break
+
+        # Complete every step finishing at the next finish time
+        time_elapsed = working_heap[0][0]
+        while working_heap and working_heap[0][0] == time_elapsed:
+            _, worker, step = heapq.heappop(working_heap)
+            heapq.heappush(free_workers, worker)
+            num_completed += 1
+
+            for next_step in successors[offsets[step]:offsets[step+1]]:
+                num_reqs[next_step] -= 1
+                if num_reqs[next_step] == 0:
+                    heapq.heappush(open_heap, next_step)
 
-    return ''.join(closed_list)
+    if num_completed < len(names):
+        raise ValueError('Requirements of steps contain a cycle.')
 
-def calculate_completion_time(instructions, num_workers=1):
+    return schedule
+
+def schedule_steps(instructions, num_workers=1, duration=step_duration):
+    '''
+    Simulate workers taking available steps in alphabetical order
+
+    Inputs:
+    - instructions: list of strings containing instructions, or pairs from
+      read_instructions
+    - num_workers: number of workers. Default is 1
+    - duration: function giving the time to complete a step from its name.
+      Default is step_duration
+
+    Output:
+    - list of the steps taken by each worker, as (step, start, finish)
+      tuples in the order they were taken
+    '''
+    return schedule_graph(build_graph(instructions), num_workers, duration)
+
+def makespan(schedule):
+    '''
+    Time at which the last step of a schedule is finished
+    '''
+    return max((steps[-1][2] for steps in schedule if steps), default=0)
+
+def calculate_completion_time(instructions, num_workers=1,
+        duration=step_duration):
     '''
     Calculate time to complete if each step takes 60 seconds + number of seconds
     corresponding to the letter: A=1, B=2, etc.
     With multiple workers, multiple steps can be performed simultaneously
 
     Input:
-    - instructions: list of strings containing instructions
+    - instructions: list of strings containing instructions, or pairs from
+      read_instructions
     - num_workers: number of workers
+    - duration: function giving the time to complete a step from its name.
+      Default is step_duration
 
     Output:
     - time to complete all steps
     '''
-    reqs, next_steps, all_steps = build_dictionaries(lines)
-    open_list, closed_list, working_list = [], [], []
+    return makespan(schedule_steps(instructions, num_workers, duration))
 
-    total_num_steps = len(all_steps)
+def critical_path(graph, duration=step_duration):
+    '''
+    Find the time to complete all steps with unlimited workers: the longest
+    chain of steps that must be completed one after the other. No number of
+    workers can complete the steps faster
 
-    time_elapsed = 0
+    Inputs:
+    - graph: output of build_graph
+    - duration: function giving the time to complete a step from its name.
+      Default is step_duration
 
-    # Find possible starting steps
-    for step in all_steps:
-        if step not in reqs:
-            open_list.append(step)
-    open_list.sort()
+    Output:
+    - length of the longest chain of steps. Raises ValueError if the
+      requirements contain a cycle
+    '''
+    names, offsets, successors, num_reqs = graph
+    num_reqs = list(num_reqs)
 
-    while len(closed_list) < total_num_steps:
-        # Give available workers steps to complete
-        while len(working_list) < num_workers:
-            # To determine whether for loop ends because of break or because
-            # end of loop has been reached
-            i = 0
+    # Earliest time each step can start
+    start = [0] * len(names)
+    open_list = [i for i, count in enumerate(num_reqs) if count == 0]
+    longest = 0
+    num_completed = 0
 
-            for _ in range(len(open_list)):
-                step = open_list[i]
+    while open_list:
+        step = open_list.pop()
+        finish = start[step] + duration(names[step])
+        longest = max(longest, finish)
+        num_completed += 1
 
-                if meets_requirements(step, reqs, closed_list):
-                    # Assign step to a worker
-                    working_list.append((step, ord(step) - ord('A') + 61))
-                    open_list.pop(i)
-                    break # Move on to next worker
+        for next_step in successors[offsets[step]:offsets[step+1]]:
+            start[next_step] = max(start[next_step], finish)
+            num_reqs[next_step] -= 1
+            if num_reqs[next_step] == 0:
+                open_list.append(next_step)
 
-                i += 1
+    if num_completed < len(names):
+        raise ValueError('Requirements of steps contain a cycle.')
 
-            if i == len(open_list):
-                # No steps in open list can be worked on. Stop searching
-                break
+    return longest
 
-        # Update times in working list
-        for i in reversed(range(len(working_list))):
-            if working_list[i][1] > 1:
-                # Tuples are immutable. Create a new one to modify it
-                working_list[i] = (working_list[i][0], working_list[i][1]-1)
+def _graph_makespan(graph, num_workers, duration):
+    '''
+    Time to complete all steps of a graph with a number of workers
+    '''
+    return makespan(schedule_graph(graph, num_workers, duration))
+
+def sweep_workers(instructions, max_workers=None, duration=step_duration,
+        num_processes=None):
+    '''
+    Calculate the time to complete all steps for increasing numbers of
+    workers, parsing the instructions once
+
+    Numbers of workers are simulated in batches, one per process. The sweep
+    stops after the first batch reaching the critical path, since more
+    workers can no longer shorten the time, or once every step has its own
+    worker.
+
+    Inputs:
+    - instructions: list of strings containing instructions, or pairs from
+      read_instructions
+    - max_workers: largest number of workers. Default is None, which is the
+      number of steps
+    - duration: function giving the time to complete a step from its name.
+      Must be defined at the top level of a module to be used in parallel.
+      Default is step_duration
+    - num_processes: number of processes. Default is None, which uses one per
+      CPU
+
+    Output:
+    - tuple of:
+        - critical path from critical_path
+        - list of (number of workers, time to complete) tuples
+    '''
+    graph = build_graph(instructions)
+    bound = critical_path(graph, duration)
+
+    if max_workers is None:
+        max_workers = len(graph[0])
+    batch_size = num_processes or os.cpu_count() or 1
+
+    table = []
+    executor = None
+    if batch_size > 1:
+        executor = ProcessPoolExecutor(max_workers=batch_size)
+
+    try:
+        for first in range(1, max_workers + 1, batch_size):
+            counts = list(range(first, min(first + batch_size, max_workers + 1)))
+            graphs = [graph] * len(counts)
+            durations = [duration] * len(counts)
+
+            if executor is not None:
+                times = executor.map(_graph_makespan, graphs, counts, durations)
             else:
-                # Step is complete
-                step = working_list[i][0]
-                closed_list.append(step)
-                working_list.pop(i)
+                times = map(_graph_makespan, graphs, counts, durations)
 
-                # Add next steps to open list 
-                if step in next_steps:
-                    for next_step in next_steps[step]:
-                        if next_step not in open_list:
-                            open_list.append(next_step)
-                    open_list.sort()
+            times = list(times)
+            table.extend(zip(counts, times))
+
+            if min(times) <= bound:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-        time_elapsed += 1
+    return bound, table
 
-    return time_elapsed
+def load_instructions(lines):
+    '''
+    Parse the instructions of an input, loading those of a LineFile parsed
+    on a previous run
+    '''
+    filename = getattr(lines, 'filename', None)
+    if filename is not None:
+        return read_instructions(filename)
+
+    return lines
+
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    return determine_order(load_instructions(lines))
+
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    return calculate_completion_time(load_instructions(lines), num_workers=5)
 
 if __name__ == '__main__':
-    lines = utils.read_lines_from_file('input.txt')
-    print(determine_order(lines))
-    print(calculate_completion_time(lines, num_workers=5))
+    instructions = read_instructions('input.txt')
+    print(determine_order(instructions))
+    print(calculate_completion_time(instructions, num_workers=5))
 
@@ -1,19 +1,16 @@
 #!/usr/bin/python
 
-def read_lines_from_file(filename):
-    '''
-    Build a list of strings line-by-line from a file.
+import os
+import sys
 
-    Input:
-    - filename: name of the file to read from
+# Make the shared modules at the top of the repository importable when a day is
+# run from its own directory
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _root not in sys.path:
+    sys.path.insert(0, _root)
 
-    Returns:
-    - output: list of strings from the file
-    '''
-    output = []
-    with open(filename, 'r') as lines:
-        for line in lines:
-            line = line.replace('\n', '')
-            output.append(line)
-
-    return output
+from common.inputs import (CHUNK_SIZE, LineFile, file_digest, iter_chunks,
+        iter_lines, map_file, read_lines_from_file)
+from common.instrument import instrument
+from common.parse import (load_numbers, load_table, parse_numbers, parse_table,
+        read_numbers)
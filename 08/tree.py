@@ -1,5 +1,7 @@
 #!/usr/bin/python
 
+import itertools
+
 import utils
 
 def convert_to_ints(line):
@@ -14,85 +16,116 @@ def convert_to_ints(line):
     '''
     return [int(x) for x in line.split(' ')]
 
-def add_metadata(data, idx=0):
+def evaluate_tree(data):
     '''
-    Add up all metadata entries from the specified index in the data
+    Add up all metadata entries and calculate the value of the root node of
+    a tree, in a single pass over the data
 
-    Inputs:
-    - data: list of integers representing the input data
-    - idx: current index in the data. Default value is 0
+    Nodes are read with an explicit stack of the nodes whose children are
+    still being read, rather than with recursion, so trees of any depth can
+    be evaluated while holding no more than the stack.
+
+    The value of a node follows these rules:
+        If a node has no children, then its value is the sum of its metadata
+        entries.
+        Otherwise, its value is the sum of the values of its children referred
+        to by its metadata entries (metadata entry 1 refers to 1st child, etc.)
+
+    Input:
+    - data: iterable of integers representing the input data, e.g. a list or
+      a generator
 
     Output:
-    - sum of metadata entries from the specified index
+    - tuple of:
+        - sum of all metadata entries
+        - value of the root node
+        - number of integers read
     '''
+    numbers = iter(data)
     mdata_sum = 0
+    count = 0
 
-    # Read header
-    num_children = data[idx] # number of child nodes
-    idx += 1
+    # [number of children left to read, number of metadata entries, values of
+    # the children read so far] of every node being read, innermost last
+    stack = []
 
-    num_mdata = data[idx] # number of metadata entries
-    idx += 1
+    while True:
+        # Read header
+        try:
+            num_children = next(numbers)
+            num_mdata = next(numbers)
+        except StopIteration:
+            raise ValueError('Data ends before the tree is complete.')
+        count += 2
 
-    # Read child nodes
-    for _ in range(num_children):
-        mdata_temp, idx = add_metadata(data, idx)
-        mdata_sum += mdata_temp
+        stack.append([num_children, num_mdata, []])
 
-    # Read metadata entries
-    for _ in range(num_mdata):
-        mdata_sum += data[idx]
-        idx += 1
+        # Read metadata entries of every node whose children were all read
+        while stack[-1][0] == 0:
+            _, num_mdata, child_values = stack.pop()
 
-    return mdata_sum, idx
+            entries = list(itertools.islice(numbers, num_mdata))
+            if len(entries) < num_mdata:
+                raise ValueError('Data ends before the tree is complete.')
+            count += num_mdata
+            mdata_sum += sum(entries)
 
-def calculate_value(data, idx=0):
+            if child_values:
+                value = sum(child_values[entry-1] for entry in entries
+                        if 0 < entry <= len(child_values))
+            else:
+                value = sum(entries)
+
+            if not stack:
+                return mdata_sum, value, count
+
+            stack[-1][0] -= 1
+            stack[-1][2].append(value)
+
+def add_metadata(data, idx=0):
     '''
-    Calculate value of the node at the specified index based on the following
-    rules:
-        If a node has no children, then its value is the sum of its metadata
-        entries.
-        Otherwise, its value is the sum of the values of its children referred
-        to by its metadata entries (metadata entry 1 refers to 1st child, etc.)
+    Add up all metadata entries from the specified index in the data
 
     Inputs:
     - data: list of integers representing the input data
     - idx: current index in the data. Default value is 0
 
     Output:
-    - value of the node at the specified index
+    - sum of metadata entries from the specified index
     '''
-    value_sum = 0
-
-    # Read header
-    num_children = data[idx] # number of child nodes
-    idx += 1
+    mdata_sum, _, count = evaluate_tree(itertools.islice(data, idx, None))
+    return mdata_sum, idx + count
 
-    num_mdata = data[idx] # number of metadata entries
-    idx += 1
+def calculate_value(data, idx=0):
+    '''
+    Calculate value of the node at the specified index. See evaluate_tree for
+    the rules
 
-    child_values = []
+    Inputs:
+    - data: list of integers representing the input data
+    - idx: current index in the data. Default value is 0
 
-    # Read child nodes
-    for _ in range(num_children):
-        value_temp, idx = calculate_value(data, idx)
-        child_values.append(value_temp)
+    Output:
+    - value of the node at the specified index
+    '''
+    _, value, count = evaluate_tree(itertools.islice(data, idx, None))
+    return value, idx + count
 
-    # Read metadata entries
-    for _ in range(num_mdata):
-        if num_children == 0:
-            value_sum += data[idx]
-        else:
-            if data[idx] < num_children + 1:
-                value_sum += child_values[data[idx]-1]
-        idx += 1
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    return evaluate_tree(convert_to_ints(next(iter(lines))))[0]
 
-    return value_sum, idx
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    return evaluate_tree(convert_to_ints(next(iter(lines))))[1]
 
 if __name__ == '__main__':
-    lines = utils.read_lines_from_file('input.txt')
-    ints = convert_to_ints(lines[0])
-
-    print(add_metadata(ints)[0])
-    print(calculate_value(ints)[0])
+    ints = convert_to_ints(next(utils.iter_lines('input.txt')))
+    mdata_sum, value, _ = evaluate_tree(ints)
 
+    print(mdata_sum)
+    print(value)
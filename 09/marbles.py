@@ -85,7 +85,19 @@ def calculate_high_score(num_players, last_marble):
 
     return max(scores)
 
+def part_one():
+    '''
+    Solve part one
+    '''
+    return calculate_high_score(479, 71035)
+
+def part_two():
+    '''
+    Solve part two
+    '''
+    return calculate_high_score(479, 7103500)
+
 if __name__ == '__main__':
-    print(calculate_high_score(479, 71035))
-    print(calculate_high_score(479, 7103500))
+    print(part_one())
+    print(part_two())
 
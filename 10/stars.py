@@ -1,32 +1,28 @@
 #!/usr/bin/python
 
-import re
-
-import matplotlib
-matplotlib.use('Agg')
-from matplotlib import pyplot as plt
-
 import utils
 
-def retrieve_values(info):
+def read_stars(filename):
     '''
-    Retrieve values from a specifically-formatted string
+    Read the position and velocity of every star in a file. The parsed values
+    are saved the first time, and loaded on later runs on the same file
 
     Input:
-    - info: a string with a specific format
+    - filename: name of the file specifying position and velocity of the stars
 
     Output:
-    - list of integers contained in the string
+    - np.array of shape (number of stars, 4) of x and y positions and
+      velocities
     '''
-    pattern = r'position=<([\s\-\d]+), ([\s\-\d]+)> velocity=<([\s\-\d]+), ([\s\-\d]+)>'
-    return [int(x) for x in re.findall(pattern, info)[0]]
+    return utils.load_numbers(filename, 4)
 
 def align_stars(data, threshold=50):
     '''
     Find the alignment of stars that results in a visible message
 
     Input:
-    - data: list of strings specifying position and velocity of the stars
+    - data: list of strings specifying position and velocity of the stars, or
+      values from read_stars
     - threshold: an estimate of the height of letters, determines when to start
       plotting the stars. Default value is 50
 
@@ -34,16 +30,10 @@ def align_stars(data, threshold=50):
     - plots of the stars, labeled with the number of seconds that have elapsed
     - time_elapsed: number of seconds that have elapsed
     '''
-    x_pos, y_pos, x_vel, y_vel = [], [], [], []
-
-    # Read positions and velocities
-    for d in data:
-        values = retrieve_values(d)
-
-        x_pos.append(values[0])
-        y_pos.append(values[1])
-        x_vel.append(values[2])
-        y_vel.append(values[3])
+    # Read positions and velocities, unless already parsed
+    if not hasattr(data, 'dtype'):
+        data = utils.parse_numbers(data, 4)
+    x_pos, y_pos, x_vel, y_vel = data.T.copy()
 
     found = False # Found an arrangement of stars within the threshold
 
@@ -51,20 +41,17 @@ def align_stars(data, threshold=50):
 
     while True:
         # Update positions
-        for i in range(len(x_pos)):
-            x_pos[i] += x_vel[i]
-            y_pos[i] += y_vel[i]
+        x_pos += x_vel
+        y_pos += y_vel
 
         time_elapsed += 1
 
-        y_diff = max(y_pos) - min(y_pos)
+        y_diff = y_pos.max() - y_pos.min()
 
         if y_diff < threshold:
             found = True
 
-            plot_positions(x_pos,
-                    [-y for y in y_pos],
-                    'plot%d.png' % time_elapsed)
+            plot_positions(x_pos, -y_pos, 'plot%d.png' % time_elapsed)
 
         # Stop looking when threshold has been met and is now being exceeded
         if found and y_diff > threshold:
@@ -73,11 +60,26 @@ def align_stars(data, threshold=50):
     return time_elapsed
 
 def plot_positions(x_pos, y_pos, name):
+    # matplotlib is slow to import, so only load it when plotting
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+
     plt.figure(1)
     plt.scatter(x_pos, y_pos)
     plt.savefig(name)
 
+def part_one(lines):
+    '''
+    Solve part one. The message is in the saved plots, and the number of
+    seconds elapsed is returned
+    '''
+    filename = getattr(lines, 'filename', None)
+    if filename is not None:
+        return align_stars(read_stars(filename))
+
+    return align_stars(lines)
+
 if __name__ == '__main__':
-    lines = utils.read_lines_from_file('input.txt')
-    align_stars(lines)
+    align_stars(read_stars('input.txt'))
 
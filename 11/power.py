@@ -1,7 +1,8 @@
 #!/usr/bin/python
 
-import numpy as np
+import utils
 
+@utils.instrument
 def compute_cell_power(x, y, serial_num):
     '''
     Compute the power level of a single fuel cell
@@ -31,6 +32,8 @@ def compute_grid_power(serial_num):
     Output:
     - grid_power: np.array of shape (300, 300)
     '''
+    import numpy as np
+
     width = 300
     length = 300
 
@@ -57,6 +60,8 @@ def find_largest_power(grid_power, n):
         indices of the top-left fuel cell of the square with largest power
         the power level of that square
     '''
+    import numpy as np
+
     width = 300 - n + 1
     length = 300 - n + 1
 
@@ -101,6 +106,18 @@ def find_largest_power_and_size(grid_power):
 
     return results[idx][0][0], results[idx][0][1], idx+1
 
+def part_one():
+    '''
+    Solve part one
+    '''
+    return find_largest_power(compute_grid_power(9424), n=3)
+
+def part_two():
+    '''
+    Solve part two
+    '''
+    return find_largest_power_and_size(compute_grid_power(9424))
+
 if __name__ == '__main__':
     grid_power = compute_grid_power(9424)
     print(find_largest_power(grid_power, n=3))
@@ -77,6 +77,7 @@ def part_one(lines):
     '''
     Solve part one
     '''
+    lines = list(lines)
     state = read_initial_state(lines[0].split(' ')[2])
     rules = create_rules(lines[2:])
     out = run_generations(state, rules, num_generations=20)
@@ -87,6 +88,7 @@ def part_two(lines):
     '''
     Solve part two
     '''
+    lines = list(lines)
     state = read_initial_state(lines[0].split(' ')[2])
     rules = create_rules(lines[2:])
     out = run_generations(state, rules, num_generations=1000)
@@ -1,7 +1,5 @@
 #!/usr/bin/python
 
-import numpy as np
-
 import utils
 
 class Cart:
@@ -11,6 +9,7 @@ class Cart:
         self.direction = direction
         self.turn_opt = 0
 
+    @utils.instrument
     def move(self):
         # 0 = right
         # 1 = up
@@ -28,6 +27,8 @@ class Cart:
         return self.x, self.y
 
 def read_map(lines):
+    import numpy as np
+
     width = len(lines[0])
     height = len(lines)
 
@@ -199,6 +200,20 @@ def draw_window(tracks, cart, window=3):
 
     print('*')
 
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    tracks, carts = read_map(list(lines))
+    return move_until_crash(tracks, carts)
+
+def part_two(lines):
+    '''
+    Solve part two
+    '''
+    tracks, carts = read_map(list(lines))
+    return move_and_remove_until_one_left(tracks, carts)
+
 if __name__ == '__main__':
     lines = utils.read_lines_from_file('input.txt')
     tracks, carts = read_map(lines)
@@ -1,35 +1,39 @@
 #!/usr/bin/python
 
-import re
-
 import utils
 
-def retrieve_values(info):
+def read_nanobots(filename):
     '''
-    Retrieve values from a specifically-formatted string
+    Read the position and range of every nanobot in a file. The parsed values
+    are saved the first time, and loaded on later runs on the same file
 
     Input:
-    - info: a string with a specific format
+    - filename: name of the file specifying position and range of each
+      nanobot
 
     Output:
-    - list of integers contained in the string
+    - np.array of shape (number of nanobots, 4) of x, y and z positions and
+      ranges
     '''
-    pattern = r'pos=<([\-\d]+),([\-\d]+),([\-\d]+)>, r=([\d]+)'
-    return [int(x) for x in re.findall(pattern, info)[0]]
+    return utils.load_numbers(filename, 4)
 
 def build_dictionary(data):
     '''
     Build dictionary of nanobots with positions and ranges
 
     Input:
-    - data: list of strings specifying position and range of each nanobot
+    - data: list of strings specifying position and range of each nanobot,
+      or values from read_nanobots
 
     Output:
     - bots: dictionary of nanobot positions and ranges
         key - position (tuple of x, y, z coordinates)
         value - range
     '''
-    parsed = [retrieve_values(d) for d in data]
+    # Read positions and ranges, unless already parsed
+    if not hasattr(data, 'dtype'):
+        data = utils.parse_numbers(data, 4)
+    parsed = data.tolist()
 
     bots = {}
 
@@ -60,6 +64,7 @@ def find_max_range(bots):
 
     return max_pos, max_range
 
+@utils.instrument
 def manhattan_dist(pos1, pos2):
     '''
     Calculate Manhattan distance between 2 positions
@@ -79,7 +84,8 @@ def count_bots_within_max_range(data):
     nanobot with the greatest range
 
     Input:
-    - data: list of strings specifying nanobot positions and ranges
+    - data: list of strings specifying nanobot positions and ranges, or
+      values from read_nanobots
 
     Output:
     - number of nanobots within range of the nanobot with the greatest range
@@ -96,7 +102,16 @@ def count_bots_within_max_range(data):
 
     return num_in_range
 
+def part_one(lines):
+    '''
+    Solve part one
+    '''
+    filename = getattr(lines, 'filename', None)
+    if filename is not None:
+        return count_bots_within_max_range(read_nanobots(filename))
+
+    return count_bots_within_max_range(lines)
+
 if __name__ == '__main__':
-    lines = utils.read_lines_from_file('input.txt')
-    print(count_bots_within_max_range(lines))
+    print(count_bots_within_max_range(read_nanobots('input.txt')))
 
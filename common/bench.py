@@ -0,0 +1,187 @@
+#!/usr/bin/python
+'''
+Benchmark the solvers of every day on generated inputs of increasing size
+
+Usage (from the top of the repository):
+    python -m common.bench [--scales 1000,10000,...] [--timeout SECONDS]
+                           [--no-memory] [DAY ...]
+
+Each part runs in a fresh process, once to measure its wall-clock time and
+once under tracemalloc to measure its peak memory, and is stopped if it takes
+longer than the timeout.
+'''
+
+import argparse
+import multiprocessing
+import os
+import tracemalloc
+
+from common.generators import GENERATORS, write_input
+from common.runner import (PARTS, ROOT, find_days, load_solver, preload_numpy,
+        run_part)
+
+# Generated inputs, kept between runs
+INPUT_DIR = os.path.join(ROOT, '.cache', 'bench')
+
+DEFAULT_SCALES = (10 ** 3, 10 ** 4, 10 ** 5)
+
+def generated_input(day, n, seed=0):
+    '''
+    Find or generate the input of a day at a given scale
+
+    Inputs:
+    - day: name of the day, e.g. '03'
+    - n: scale of the input
+    - seed: seed of the random number generator. Default is 0
+
+    Output:
+    - path to the generated input file
+    '''
+    os.makedirs(INPUT_DIR, exist_ok=True)
+    path = os.path.join(INPUT_DIR, '%s-%d-%d.txt' % (day, n, seed))
+
+    if not os.path.isfile(path):
+        temp_path = '%s.%d' % (path, os.getpid())
+        write_input(day, n, temp_path, seed)
+        os.replace(temp_path, path)
+
+    return path
+
+def _measure(solver_path, part, input_path, memory, conn):
+    '''
+    Run one part in a child process and send back (seconds, peak bytes)
+    '''
+    try:
+        load_solver(solver_path)
+        preload_numpy()
+
+        if memory:
+            tracemalloc.start()
+            run_part(solver_path, part, input_path)
+            conn.send((None, tracemalloc.get_traced_memory()[1]))
+        else:
+            conn.send((run_part(solver_path, part, input_path)[1], None))
+    except Exception as e:
+        conn.send(e)
+
+def measure(solver_path, part, input_path, timeout, memory=False):
+    '''
+    Measure the time or peak memory of one part in a fresh process
+
+    Inputs:
+    - solver_path: path to the solver module of the day
+    - part: name of the part function
+    - input_path: path to the input file
+    - timeout: number of seconds after which the part is stopped
+    - memory: whether to measure peak memory instead of time. Default is False
+
+    Output:
+    - tuple of (seconds, peak bytes), one of which is None. Raises
+      TimeoutError if the part takes too long
+    '''
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_measure,
+            args=(solver_path, part, input_path, memory, sender))
+    process.start()
+    sender.close()
+
+    if not receiver.poll(timeout):
+        process.terminate()
+        process.join()
+        raise TimeoutError('took longer than %gs' % timeout)
+
+    try:
+        result = receiver.recv()
+    except EOFError:
+        process.join()
+        raise RuntimeError('process exited with code %d' % process.exitcode)
+    process.join()
+
+    if isinstance(result, Exception):
+        raise result
+
+    return result
+
+def benchmark(days, scales=DEFAULT_SCALES, timeout=60.0, memory=True):
+    '''
+    Benchmark every part of several days at several scales. Once a part fails
+    or times out, it is not run at larger scales
+
+    Inputs:
+    - days: list of (day, path to solver module) tuples
+    - scales: input scales to run at. Default is DEFAULT_SCALES
+    - timeout: number of seconds after which a part is stopped. Default is 60
+    - memory: whether to also measure peak memory. Default is True
+
+    Output:
+    - generator of (day, part, n, seconds, peak bytes, error) tuples
+    '''
+    for day, solver_path in days:
+        if day not in GENERATORS:
+            continue
+
+        try:
+            module = load_solver(solver_path)
+        except Exception as e:
+            yield day, 'import', 0, None, None, e
+            continue
+
+        parts = [p for p in PARTS if hasattr(module, p)]
+
+        for n in sorted(scales):
+            input_path = generated_input(day, n)
+
+            for part in list(parts):
+                try:
+                    seconds = measure(solver_path, part, input_path, timeout)[0]
+                    peak = None
+                    if memory:
+                        peak = measure(solver_path, part, input_path, timeout,
+                                memory=True)[1]
+                except Exception as e:
+                    parts.remove(part)
+                    yield day, part, n, None, None, e
+                    continue
+
+                yield day, part, n, seconds, peak, None
+
+def format_row(day, part, n, seconds, peak, error):
+    '''
+    Format one benchmark result as a line of a table
+    '''
+    if error is not None:
+        return '%s  %-8s  %10d  %s' % (day, part, n, 'error: %r' % error)
+
+    throughput = n / seconds if seconds > 0 else float('inf')
+    memory = '%10.1f MiB' % (peak / 2 ** 20) if peak is not None else ''
+
+    return '%s  %-8s  %10d  %10.3fs  %12.0f/s  %s' % (day, part, n, seconds,
+            throughput, memory)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Benchmark the solvers of every day on generated inputs')
+    parser.add_argument('days', nargs='*',
+            help='days to benchmark, e.g. 03 12. Default is every day')
+    parser.add_argument('--scales',
+            default=','.join(str(n) for n in DEFAULT_SCALES),
+            help='comma-separated input scales. Default is %(default)s')
+    parser.add_argument('--timeout', type=float, default=60.0,
+            help='seconds after which a part is stopped. Default is %(default)s')
+    parser.add_argument('--no-memory', action='store_true',
+            help='only measure time')
+    args = parser.parse_args(argv)
+
+    days = find_days()
+    if args.days:
+        wanted = set(day.zfill(2) for day in args.days)
+        days = [d for d in days if d[0] in wanted]
+
+    scales = [int(float(n)) for n in args.scales.split(',')]
+
+    print('day part               n        time    throughput  peak memory')
+    for row in benchmark(days, scales, args.timeout, not args.no_memory):
+        print(format_row(*row), flush=True)
+
+if __name__ == '__main__':
+    main()
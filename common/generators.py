@@ -0,0 +1,256 @@
+#!/usr/bin/python
+'''
+Generate valid inputs of any size for the days that read an input file
+
+Every generator takes a scale n and a random.Random instance, and yields the
+lines of the input. Days 09 and 11 take no input file and have no generator.
+'''
+
+import datetime
+import random
+import string
+
+def generate_frequencies(n, rng):
+    '''
+    Day 01: n frequency changes whose sum drifts slowly, so that a frequency
+    is eventually repeated
+    '''
+    total = 0
+
+    for _ in range(n - 1):
+        change = rng.randint(1, 20) * rng.choice((-1, 1))
+        total += change
+        yield '%+d' % change
+
+    # Keep the drift per pass small compared to the spread of the frequencies
+    yield '%+d' % (rng.randint(1, 5) - total)
+
+def generate_box_ids(n, rng, length=26):
+    '''
+    Day 02: n random box IDs, two of which differ by exactly one letter
+    '''
+    letters = string.ascii_lowercase
+    close = rng.randrange(n - 1)
+
+    for i in range(n - 1):
+        box_id = ''.join(rng.choice(letters) for _ in range(length))
+
+        if i == close:
+            pair = box_id
+        yield box_id
+
+    pos = rng.randrange(length)
+    yield pair[:pos] + letters[(letters.index(pair[pos]) + 1) % 26] + pair[pos+1:]
+
+def generate_claims(n, rng, size=1000):
+    '''
+    Day 03: n claims on a fabric of size x size square inches
+    '''
+    for i in range(1, n + 1):
+        width = rng.randint(10, 29)
+        height = rng.randint(10, 29)
+        x = rng.randint(0, size - width)
+        y = rng.randint(0, size - height)
+        yield '#%d @ %d,%d: %dx%d' % (i, x, y, width, height)
+
+def generate_guard_records(n, rng, num_guards=50):
+    '''
+    Day 04: about n shuffled records of guards falling asleep and waking up
+    during the midnight hour
+    '''
+    guards = rng.sample(range(10, 4000), num_guards)
+    day = datetime.datetime(1518, 1, 1)
+    records = []
+
+    while len(records) < n:
+        # Guards sometimes start their shift before midnight
+        if rng.random() < 0.5:
+            start = day - datetime.timedelta(minutes=rng.randint(1, 10))
+            minute = 0
+        else:
+            start = day + datetime.timedelta(minutes=rng.randint(0, 5))
+            minute = start.minute + 1
+        records.append('[%s] Guard #%d begins shift'
+                % (start.strftime('%Y-%m-%d %H:%M'), rng.choice(guards)))
+
+        date = day.strftime('%Y-%m-%d')
+        while minute < 55 and rng.random() < 0.7:
+            asleep = rng.randint(minute, 55)
+            awake = rng.randint(asleep + 1, 59)
+            records.append('[%s 00:%02d] falls asleep' % (date, asleep))
+            records.append('[%s 00:%02d] wakes up' % (date, awake))
+            minute = awake + 1
+
+        day += datetime.timedelta(days=1)
+
+    rng.shuffle(records)
+    return iter(records)
+
+def generate_polymer(n, rng):
+    '''
+    Day 05: a single polymer of n units
+    '''
+    yield ''.join(rng.choices(string.ascii_letters, k=n))
+
+def step_name(i):
+    '''
+    Name of the i-th step of a generated DAG: A to Z, then AA, AB, etc.
+    '''
+    name = ''
+    i += 1
+
+    while i > 0:
+        i, rem = divmod(i - 1, 26)
+        name = string.ascii_uppercase[rem] + name
+
+    return name
+
+def generate_instructions(n, rng, max_reqs=3):
+    '''
+    Day 07: a DAG of n steps, each requiring up to max_reqs earlier steps.
+    Steps after the first 26 have multi-letter names, see step_name
+    '''
+    for i in range(1, n):
+        reqs = set(rng.randrange(i) for _ in range(rng.randint(1, max_reqs)))
+
+        for j in sorted(reqs):
+            yield 'Step %s must be finished before step %s can begin.' % (
+                    step_name(j), step_name(i))
+
+def generate_tree(n, rng, max_children=5, max_mdata=5):
+    '''
+    Day 08: a single line describing a tree of n nodes
+    '''
+    # Attach every node after the root to one of the few nodes before it
+    children = [[] for _ in range(n)]
+    for i in range(1, n):
+        children[rng.randrange(max(0, i - max_children), i)].append(i)
+
+    # Write the header, children and metadata of each node depth-first
+    output = []
+    stack = [(0, 0)]
+
+    while stack:
+        node, num_mdata = stack.pop()
+        num_children = len(children[node])
+
+        if num_mdata > 0:
+            # All children written, finish with the metadata entries
+            output.extend(str(rng.randint(1, num_children + 1))
+                    for _ in range(num_mdata))
+            continue
+
+        num_mdata = rng.randint(1, max_mdata)
+        output.append(str(num_children))
+        output.append(str(num_mdata))
+        stack.append((node, num_mdata))
+        stack.extend((child, 0) for child in reversed(children[node]))
+
+    yield ' '.join(output)
+
+def generate_stars(n, rng):
+    '''
+    Day 10: n stars that line up into a small area after some seconds
+    '''
+    seconds = rng.randint(10000, 11000)
+
+    for _ in range(n):
+        x, y = rng.randint(0, 60), rng.randint(0, 9)
+        x_vel, y_vel = rng.randint(-5, 5), rng.randint(-5, 5)
+        yield 'position=<%6d, %6d> velocity=<%2d, %2d>' % (
+                x - x_vel * seconds, y - y_vel * seconds, x_vel, y_vel)
+
+def generate_plants(n, rng):
+    '''
+    Day 12: an initial state of n pots, and a rule for every pattern
+    '''
+    yield 'initial state: ' + ''.join(rng.choice('#.') for _ in range(n))
+    yield ''
+
+    for i in range(32):
+        pattern = ''.join('#' if i & (1 << j) else '.' for j in range(5))
+
+        # Empty pots must stay empty, and the leftmost plant always spreads
+        # further left so the plants never die out
+        if i == 0:
+            result = '.'
+        elif i == 1 << 4:
+            result = '#'
+        else:
+            result = rng.choice('#.')
+        yield '%s => %s' % (pattern, result)
+
+def generate_tracks(n, rng, width=12, height=8):
+    '''
+    Day 13: n separate loops of track, all but one with two carts going round
+    in opposite directions, laid out in a square grid
+    '''
+    per_row = max(1, int(n ** 0.5))
+    num_rows = (n + per_row - 1) // per_row
+    grid = [[' '] * (per_row * (width + 1)) for _ in range(num_rows * (height + 1))]
+
+    for k in range(n):
+        left = (k % per_row) * (width + 1)
+        top = (k // per_row) * (height + 1)
+        right, bottom = left + width - 1, top + height - 1
+
+        for i in range(left + 1, right):
+            grid[top][i] = grid[bottom][i] = '-'
+        for j in range(top + 1, bottom):
+            grid[j][left] = grid[j][right] = '|'
+        grid[top][left] = grid[bottom][right] = '/'
+        grid[top][right] = grid[bottom][left] = '\\'
+
+        # Carts heading right along the top and the bottom go round in
+        # opposite directions. The first loop only gets one, so a single cart
+        # survives
+        grid[top][rng.randint(left + 1, right - 1)] = '>'
+        if k > 0:
+            grid[bottom][rng.randint(left + 1, right - 1)] = '>'
+
+    for row in grid:
+        yield ''.join(row)
+
+def generate_nanobots(n, rng, size=10 ** 8):
+    '''
+    Day 23: n nanobots at distinct positions
+    '''
+    positions = set()
+
+    while len(positions) < n:
+        positions.add((rng.randint(-size, size), rng.randint(-size, size),
+                rng.randint(-size, size)))
+
+    for x, y, z in positions:
+        yield 'pos=<%d,%d,%d>, r=%d' % (x, y, z, rng.randint(size // 100, size))
+
+GENERATORS = {
+    '01': generate_frequencies,
+    '02': generate_box_ids,
+    '03': generate_claims,
+    '04': generate_guard_records,
+    '05': generate_polymer,
+    '07': generate_instructions,
+    '08': generate_tree,
+    '10': generate_stars,
+    '12': generate_plants,
+    '13': generate_tracks,
+    '23': generate_nanobots,
+}
+
+def write_input(day, n, filename, seed=0):
+    '''
+    Write a generated input to a file
+
+    Inputs:
+    - day: name of the day, e.g. '03'
+    - n: scale of the input (number of lines, units, nodes, etc.)
+    - filename: name of the file to write to
+    - seed: seed of the random number generator. Default is 0
+    '''
+    rng = random.Random(seed)
+
+    with open(filename, 'w') as f:
+        for line in GENERATORS[day](n, rng):
+            f.write(line)
+            f.write('\n')
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+
+import hashlib
+import mmap
+import os
+from contextlib import contextmanager
+
+# Number of bytes read at a time when streaming a file in chunks
+CHUNK_SIZE = 1 << 20
+
+# Digests of inputs, keyed by their path, size and modification time
+DIGEST_DIR = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), '.cache', 'digests')
+
+def iter_lines(filename):
+    '''
+    Lazily yield lines from a file without their trailing newline
+
+    Input:
+    - filename: name of the file to read from
+
+    Output:
+    - generator of strings, one per line of the file
+    '''
+    with open(filename, 'r') as lines:
+        for line in lines:
+            yield line.rstrip('\n')
+
+def read_lines_from_file(filename):
+    '''
+    Build a list of strings line-by-line from a file.
+
+    Input:
+    - filename: name of the file to read from
+
+    Returns:
+    - output: list of strings from the file
+    '''
+    return list(iter_lines(filename))
+
+class LineFile:
+    '''
+    Re-iterable sequence of the lines in a file
+
+    Every iteration re-opens the file and streams it again, so solvers that
+    need more than one pass over their input do not have to hold it in memory.
+    The name of the file is kept for solvers that prefer to read raw bytes.
+    '''
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __iter__(self):
+        return iter_lines(self.filename)
+
+def iter_chunks(filename, chunk_size=CHUNK_SIZE, delimiter=None):
+    '''
+    Lazily yield a file in chunks of bytes
+
+    Inputs:
+    - filename: name of the file to read from
+    - chunk_size: number of bytes to read at a time. Default is CHUNK_SIZE
+    - delimiter: if given, every chunk is cut just after the last delimiter it
+      contains, and the remainder is carried over to the next chunk. This keeps
+      records (e.g. lines with b'\\n') from being split across chunks
+
+    Output:
+    - generator of non-empty bytes objects
+    '''
+    tail = b''
+
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+
+            if not chunk:
+                break
+
+            if delimiter is None:
+                yield chunk
+                continue
+
+            chunk = tail + chunk
+
+            # Hold back the partial record at the end of the chunk
+            cut = chunk.rfind(delimiter) + len(delimiter)
+            if cut < len(delimiter):
+                tail = chunk
+            else:
+                tail = chunk[cut:]
+                yield chunk[:cut]
+
+    if tail:
+        yield tail
+
+@contextmanager
+def map_file(filename):
+    '''
+    Memory-map a file for reading
+
+    Input:
+    - filename: name of the file to map
+
+    Output:
+    - read-only bytes-like view of the whole file (b'' for an empty file)
+    '''
+    with open(filename, 'rb') as f:
+        # Empty files cannot be mapped
+        if f.seek(0, 2) == 0:
+            yield b''
+            return
+
+        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield view
+        finally:
+            view.close()
+
+def file_digest(filename, chunk_size=CHUNK_SIZE):
+    '''
+    Compute the SHA-256 digest of a file without loading it into memory
+
+    Inputs:
+    - filename: name of the file to hash
+    - chunk_size: number of bytes to hash at a time. Default is CHUNK_SIZE
+
+    Output:
+    - hexadecimal digest of the file contents
+    '''
+    digest = hashlib.sha256()
+
+    for chunk in iter_chunks(filename, chunk_size):
+        digest.update(chunk)
+
+    return digest.hexdigest()
+
+# Digests of inputs computed by this process
+# key: (path, size, modification time in ns) of an input
+# value: hexadecimal digest of its contents
+_input_digests = {}
+
+def input_digest(input_path):
+    '''
+    Compute the digest of an input, reading it only if it changed since the
+    last time its digest was computed. Digests are remembered in memory and
+    on disk, keyed by the path, size and modification time of the input
+
+    Input:
+    - input_path: path to the input file
+
+    Output:
+    - hexadecimal digest of the contents of the input
+    '''
+    stat = os.stat(input_path)
+    stamp = (os.path.abspath(input_path), stat.st_size, stat.st_mtime_ns)
+
+    if stamp in _input_digests:
+        return _input_digests[stamp]
+
+    path = os.path.join(DIGEST_DIR,
+            hashlib.sha256(repr(stamp).encode()).hexdigest())
+
+    try:
+        with open(path, 'r') as f:
+            digest = f.read()
+    except OSError:
+        digest = ''
+
+    if len(digest) != 64:
+        digest = file_digest(input_path)
+
+        # Write to a temporary file first so readers never see a partial entry
+        os.makedirs(DIGEST_DIR, exist_ok=True)
+        temp_path = '%s.%d' % (path, os.getpid())
+        with open(temp_path, 'w') as f:
+            f.write(digest)
+        os.replace(temp_path, path)
+
+    _input_digests[stamp] = digest
+    return digest
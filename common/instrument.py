@@ -0,0 +1,228 @@
+#!/usr/bin/python
+'''
+Opt-in instrumentation of hot functions
+
+Set the environment variable AOC_INSTRUMENT to 1 to record, for every function
+decorated with @instrument, the number of calls, the total and self time, and a
+histogram of the latency of the first call and every SAMPLE_EVERY-th call
+after it. A report is printed to stderr when the program exits. When the
+variable is not set, the decorator returns functions unchanged, so it costs
+nothing.
+
+Calls made in worker processes (e.g. of a ProcessPoolExecutor) are saved to
+a temporary directory when each worker exits, and added to the report of the
+process that started them.
+'''
+
+import atexit
+import functools
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+ENABLED = os.environ.get('AOC_INSTRUMENT', '') not in ('', '0')
+
+# Process printing the report, inherited by the processes it starts
+if ENABLED:
+    os.environ.setdefault('AOC_INSTRUMENT_ROOT', str(os.getpid()))
+ROOT_PID = int(os.environ.get('AOC_INSTRUMENT_ROOT', os.getpid()))
+
+# Statistics saved by worker processes for the report
+WORKER_DIR = os.path.join(tempfile.gettempdir(), 'aoc-instrument-%d' % ROOT_PID)
+
+# Record the latency of one call out of this many in the histograms
+SAMPLE_EVERY = int(os.environ.get('AOC_INSTRUMENT_SAMPLE', '16'))
+
+class FunctionStats:
+    '''
+    Statistics recorded for one instrumented function
+    '''
+    __slots__ = ('name', 'calls', 'total', 'self_time', 'histogram')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0 # seconds, including calls to other functions
+        self.self_time = 0.0 # seconds, excluding instrumented callees
+
+        # key: latency bucket, a call in bucket b took less than 2**b ns
+        # value: number of sampled calls in the bucket
+        self.histogram = {}
+
+    def percentile(self, fraction):
+        '''
+        Estimate a latency percentile in seconds from the histogram, or None
+        if no call was sampled
+        '''
+        total = sum(self.histogram.values())
+        seen = 0
+
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= fraction * total:
+                return 2 ** bucket / 1e9
+
+        return None
+
+    def merge(self, other):
+        '''
+        Add the statistics of the same function recorded by another process
+        '''
+        self.calls += other.calls
+        self.total += other.total
+        self.self_time += other.self_time
+
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+
+    def reset(self):
+        '''
+        Forget every call recorded so far
+        '''
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.histogram = {}
+
+# Statistics of every instrumented function, in order of decoration
+stats = []
+
+# Time spent in instrumented callees of each active call, innermost last
+_child_times = [0.0]
+
+def instrument(func):
+    '''
+    Decorator recording statistics about calls to a function when
+    instrumentation is enabled
+
+    Input:
+    - func: function to instrument
+
+    Output:
+    - func itself if instrumentation is disabled, a wrapper otherwise
+    '''
+    if not ENABLED:
+        return func
+
+    record = FunctionStats('%s.%s' % (func.__module__, func.__qualname__))
+    stats.append(record)
+
+    clock = time.perf_counter_ns
+    child_times = _child_times
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        child_times.append(0)
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            children = child_times.pop()
+            child_times[-1] += elapsed
+
+            record.calls += 1
+            record.total += elapsed / 1e9
+            record.self_time += (elapsed - children) / 1e9
+
+            # Sample calls 1, 1 + SAMPLE_EVERY, ... so every function
+            # called gets a latency
+            if record.calls % SAMPLE_EVERY == 1 % SAMPLE_EVERY:
+                bucket = elapsed.bit_length()
+                record.histogram[bucket] = record.histogram.get(bucket, 0) + 1
+
+    return wrapper
+
+def _reset_after_fork():
+    '''
+    Forget the calls of the parent in a forked worker
+    '''
+    for record in stats:
+        record.reset()
+
+def save_worker_stats():
+    '''
+    Save the statistics of a worker process for the report of ROOT_PID
+    '''
+    called = [s for s in stats if s.calls > 0]
+    if os.getpid() == ROOT_PID or not called:
+        return
+
+    os.makedirs(WORKER_DIR, exist_ok=True)
+    with open(os.path.join(WORKER_DIR, '%d.pickle' % os.getpid()), 'wb') as f:
+        pickle.dump(called, f)
+
+def load_worker_stats():
+    '''
+    Add the statistics saved by worker processes to those of this process,
+    and remove them
+
+    Output:
+    - list of statistics of every instrumented function, merged by name
+    '''
+    merged = {s.name: s for s in stats}
+
+    if os.path.isdir(WORKER_DIR):
+        for filename in sorted(os.listdir(WORKER_DIR)):
+            path = os.path.join(WORKER_DIR, filename)
+            try:
+                with open(path, 'rb') as f:
+                    worker_stats = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+            finally:
+                os.remove(path)
+
+            for record in worker_stats:
+                if record.name not in merged:
+                    merged[record.name] = FunctionStats(record.name)
+                merged[record.name].merge(record)
+
+        os.rmdir(WORKER_DIR)
+
+    return list(merged.values())
+
+def _format_latency(seconds):
+    return '%8.2fus' % (seconds * 1e6) if seconds is not None else '%10s' % '-'
+
+def report(file=None):
+    '''
+    Print the statistics of every instrumented function that was called in
+    this process or its workers, slowest first. Only the process that started
+    the others prints a report
+
+    Input:
+    - file: file to print to. Default is sys.stderr
+    '''
+    if os.getpid() != ROOT_PID:
+        return
+
+    file = file if file is not None else sys.stderr
+    called = sorted((s for s in load_worker_stats() if s.calls > 0),
+            key=lambda s: s.total, reverse=True)
+
+    if not called:
+        return
+
+    print('%-50s %12s %10s %10s %10s %10s' % ('function', 'calls', 'total',
+            'self', 'p50', 'p99'), file=file)
+
+    for s in called:
+        print('%-50s %12d %9.3fs %9.3fs %s %s' % (s.name, s.calls, s.total,
+                s.self_time, _format_latency(s.percentile(0.5)),
+                _format_latency(s.percentile(0.99))), file=file)
+
+if ENABLED:
+    import multiprocessing.util
+
+    atexit.register(report)
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+    # Workers of multiprocessing exit without running atexit, but run the
+    # finalizers registered once they have started
+    atexit.register(save_worker_stats)
+    multiprocessing.util.register_after_fork(sys.modules[__name__],
+            lambda module: multiprocessing.util.Finalize(None,
+                save_worker_stats, exitpriority=100))
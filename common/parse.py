@@ -0,0 +1,211 @@
+#!/usr/bin/python
+'''
+Parse whole inputs at once into NumPy arrays
+
+NumPy is imported by each function rather than by the module, so importing a
+day stays fast.
+'''
+
+import functools
+import hashlib
+import itertools
+import mmap
+import os
+import re
+
+from common.inputs import CHUNK_SIZE, input_digest, iter_chunks
+
+# Parsed inputs, saved as .npy files keyed by the digest of the input
+PARSED_DIR = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), '.cache', 'parsed')
+
+@functools.lru_cache(maxsize=None)
+def compile_pattern(pattern):
+    '''
+    Compile a regular expression once, for matching bytes
+
+    Input:
+    - pattern: regular expression, as a string or bytes
+
+    Output:
+    - compiled regular expression
+    '''
+    if isinstance(pattern, str):
+        pattern = pattern.encode()
+
+    return re.compile(pattern)
+
+def to_bytes(data):
+    '''
+    Convert an input to a single bytes-like buffer
+
+    Input:
+    - data: bytes-like object, string, or iterable of lines
+
+    Output:
+    - bytes-like object
+    '''
+    if isinstance(data, (bytes, bytearray, memoryview, mmap.mmap)):
+        return data
+    if isinstance(data, str):
+        return data.encode()
+
+    return '\n'.join(data).encode()
+
+def parse_table(pattern, data, dtype=None):
+    '''
+    Find every match of a regular expression in an input, in one pass
+
+    Inputs:
+    - pattern: regular expression with one group per column
+    - data: bytes-like object, string, or iterable of lines
+    - dtype: type of the columns, e.g. 'int64'. Default is None, which keeps
+      the matched bytes
+
+    Output:
+    - np.array of shape (number of matches, number of groups)
+    '''
+    import numpy as np
+
+    regex = compile_pattern(pattern)
+    matches = regex.findall(to_bytes(data))
+    num_groups = max(regex.groups, 1)
+
+    if regex.groups <= 1:
+        matches = [(m,) for m in matches]
+
+    if dtype is None or np.dtype(dtype).kind == 'S':
+        table = np.array(matches, dtype=dtype or 'S')
+        return table.reshape(len(matches), num_groups)
+
+    # Converting one long string is much faster than converting every field
+    fields = b' '.join(itertools.chain.from_iterable(matches))
+    table = np.fromstring(fields, dtype=dtype, sep=' ')
+
+    if table.size != len(matches) * num_groups:
+        raise ValueError('pattern %r matched fields that are not numbers'
+                % regex.pattern)
+
+    return table.reshape(len(matches), num_groups)
+
+def _number_table(signed):
+    '''
+    Table for bytes.translate that keeps the characters of numbers and turns
+    everything else into spaces
+    '''
+    keep = b'0123456789+-' if signed else b'0123456789'
+    return bytes(c if c in keep else ord(' ') for c in range(256))
+
+_SIGNED = _number_table(True)
+_UNSIGNED = _number_table(False)
+
+def parse_numbers(data, num_columns, dtype='int64', signed=True):
+    '''
+    Parse every number in an input, for inputs whose records contain nothing
+    but the numbers to extract
+
+    Inputs:
+    - data: bytes-like object, string, or iterable of lines
+    - num_columns: number of numbers in each record
+    - dtype: type of the columns. Default is 'int64'
+    - signed: whether '+' and '-' are signs rather than separators. Default
+      is True
+
+    Output:
+    - np.array of shape (number of records, num_columns)
+    '''
+    import numpy as np
+
+    text = bytes(to_bytes(data)).translate(_SIGNED if signed else _UNSIGNED)
+    numbers = np.fromstring(text, dtype=dtype, sep=' ')
+
+    if numbers.size % num_columns != 0:
+        raise ValueError('found %d numbers, not a multiple of %d'
+                % (numbers.size, num_columns))
+
+    return numbers.reshape(-1, num_columns)
+
+def read_numbers(filename, num_columns, dtype='int64', signed=True,
+        chunk_size=CHUNK_SIZE):
+    '''
+    Parse every number in a file like parse_numbers, reading it in chunks so
+    that only the parsed array is held in memory
+
+    Inputs:
+    - filename: name of the file to read from
+    - num_columns: number of numbers in each line
+    - dtype: type of the columns. Default is 'int64'
+    - signed: whether '+' and '-' are signs rather than separators. Default
+      is True
+    - chunk_size: number of bytes to parse at a time. Default is CHUNK_SIZE
+
+    Output:
+    - np.array of shape (number of lines, num_columns)
+    '''
+    import numpy as np
+
+    chunks = [parse_numbers(chunk, num_columns, dtype, signed)
+            for chunk in iter_chunks(filename, chunk_size, b'\n')]
+
+    if not chunks:
+        return np.empty((0, num_columns), dtype=dtype)
+
+    return np.concatenate(chunks)
+
+def cached_parse(filename, parse, *args):
+    '''
+    Parse a file, or load the result of parsing the same contents before.
+    The array is saved the first time as a .npy file keyed by the digest of
+    the file and the parser, and memory-mapped on later calls. The file is
+    only read again to compute its digest if its size or modification time
+    changed
+
+    Inputs:
+    - filename: name of the file to parse
+    - parse: function taking the file name and args, returning an np.array
+    - args: other arguments of parse
+
+    Output:
+    - np.array (read-only when loaded from the cache)
+    '''
+    import numpy as np
+
+    parser = '%s.%s%r' % (parse.__module__, parse.__qualname__, args)
+    key = hashlib.sha256(parser.encode()).hexdigest()[:16]
+    path = os.path.join(PARSED_DIR, '%s-%s.npy' % (input_digest(filename), key))
+
+    try:
+        return np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+
+    table = parse(filename, *args)
+
+    # Write to a temporary file first so readers never see a partial array
+    os.makedirs(PARSED_DIR, exist_ok=True)
+    temp_path = '%s.%d.npy' % (path[:-4], os.getpid())
+    np.save(temp_path, table)
+    os.replace(temp_path, path)
+
+    return table
+
+def _read_table(filename, pattern, dtype):
+    '''
+    Parse a file with parse_table
+    '''
+    with open(filename, 'rb') as f:
+        return parse_table(pattern, f.read(), dtype)
+
+def load_table(filename, pattern, dtype=None):
+    '''
+    Parse a file like parse_table, reusing the result of previous runs on the
+    same contents
+    '''
+    return cached_parse(filename, _read_table, pattern, dtype)
+
+def load_numbers(filename, num_columns, dtype='int64', signed=True):
+    '''
+    Parse a file like read_numbers, reusing the result of previous runs on the
+    same contents
+    '''
+    return cached_parse(filename, read_numbers, num_columns, dtype, signed)
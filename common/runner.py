@@ -0,0 +1,365 @@
+#!/usr/bin/python
+'''
+Run the solvers of every day and report the time taken by each part
+
+Usage (from the top of the repository):
+    python -m common.runner [--input-dir DIR] [--no-cache] [--workers N]
+                            [DAY ...]
+'''
+
+import argparse
+import hashlib
+import importlib.util
+import os
+import pickle
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from common.inputs import LineFile, input_digest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Results of previous runs, keyed by input and solver digests
+CACHE_DIR = os.path.join(ROOT, '.cache', 'results')
+
+PARTS = ('part_one', 'part_two')
+
+def find_days(root=ROOT):
+    '''
+    Find the solver module of every day in the repository
+
+    Input:
+    - root: directory containing one directory per day. Default is ROOT
+
+    Output:
+    - list of (day, path to solver module) tuples, sorted by day
+    '''
+    days = []
+
+    for name in sorted(os.listdir(root)):
+        day_dir = os.path.join(root, name)
+
+        if not re.match(r'^\d\d$', name) or not os.path.isdir(day_dir):
+            continue
+
+        for filename in sorted(os.listdir(day_dir)):
+            if not filename.endswith('.py') or filename == 'utils.py':
+                continue
+
+            path = os.path.join(day_dir, filename)
+            with open(path, 'r') as f:
+                if re.search(r'^def part_one\(', f.read(), re.MULTILINE):
+                    days.append((name, path))
+                    break
+
+    return days
+
+@contextmanager
+def day_context(solver_path):
+    '''
+    Run code as if it were started from the directory of a day, so the day's
+    own utils module is importable and relative paths resolve there
+
+    Input:
+    - solver_path: path to the solver module of the day
+    '''
+    day_dir = os.path.dirname(os.path.abspath(solver_path))
+    cwd = os.getcwd()
+
+    # Every day has its own utils module
+    sys.modules.pop('utils', None)
+    sys.path.insert(0, day_dir)
+    os.chdir(day_dir)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(day_dir)
+
+def load_solver(solver_path):
+    '''
+    Import the solver module of a day
+
+    Input:
+    - solver_path: path to the solver module of the day
+
+    Output:
+    - the imported module
+    '''
+    day = os.path.basename(os.path.dirname(os.path.abspath(solver_path)))
+    name = 'day%s_%s' % (day, os.path.splitext(os.path.basename(solver_path))[0])
+
+    if name in sys.modules:
+        return sys.modules[name]
+
+    with day_context(solver_path):
+        spec = importlib.util.spec_from_file_location(name, solver_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+
+    return module
+
+def find_input(day, solver_path, input_dir=None):
+    '''
+    Find the input file of a day
+
+    Inputs:
+    - day: name of the day, e.g. '03'
+    - solver_path: path to the solver module of the day
+    - input_dir: directory containing inputs named <day>.txt. Default is None,
+      which uses input.txt next to the solver
+
+    Output:
+    - path to the input file, or None if the day takes no input
+    '''
+    if input_dir is None:
+        path = os.path.join(os.path.dirname(solver_path), 'input.txt')
+    else:
+        path = os.path.join(input_dir, '%s.txt' % day)
+
+    return os.path.abspath(path) if os.path.isfile(path) else None
+
+def solver_digest(solver_path):
+    '''
+    Compute a digest of the source code of a day, including the shared
+    modules it uses
+
+    Input:
+    - solver_path: path to the solver module of the day
+
+    Output:
+    - hexadecimal digest of every Python file in the day's directory and in
+      common
+    '''
+    day_dir = os.path.dirname(os.path.abspath(solver_path))
+    common_dir = os.path.join(ROOT, 'common')
+    digest = hashlib.sha256()
+
+    for prefix, directory in (('', day_dir), ('common/', common_dir)):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.py'):
+                digest.update((prefix + filename).encode())
+                with open(os.path.join(directory, filename), 'rb') as f:
+                    digest.update(f.read())
+
+    return digest.hexdigest()
+
+def cache_key(solver_path, input_path, part):
+    '''
+    Build the key under which the result of a part is cached
+
+    Inputs:
+    - solver_path: path to the solver module of the day
+    - input_path: path to the input file, or None
+    - part: name of the part function
+
+    Output:
+    - hexadecimal key
+    '''
+    input_hash = input_digest(input_path) if input_path is not None else ''
+    key = '%s:%s:%s' % (solver_digest(solver_path), input_hash, part)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def load_cached(key):
+    '''
+    Load a cached result
+
+    Input:
+    - key: cache key of the result
+
+    Output:
+    - tuple of (result, seconds) from the original run, or None if not cached
+    '''
+    path = os.path.join(CACHE_DIR, key + '.pickle')
+
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+def store_cached(key, result, seconds):
+    '''
+    Save a result in the cache
+
+    Inputs:
+    - key: cache key of the result
+    - result: value returned by the part
+    - seconds: time taken to compute the result
+    '''
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, key + '.pickle')
+
+    # Write to a temporary file first so readers never see a partial entry
+    temp_path = '%s.%d' % (path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        pickle.dump((result, seconds), f)
+    os.replace(temp_path, path)
+
+def preload_numpy():
+    '''
+    Import NumPy, which solvers only import when first called, so that the
+    time and memory measured for a part do not include the import
+    '''
+    try:
+        import numpy
+    except ImportError:
+        pass
+
+def run_part(solver_path, part, input_path=None):
+    '''
+    Run one part of a day
+
+    Inputs:
+    - solver_path: path to the solver module of the day
+    - part: name of the part function
+    - input_path: path to the input file, or None if the day takes no input
+
+    Output:
+    - tuple of (result, seconds taken)
+    '''
+    module = load_solver(solver_path)
+    solve = getattr(module, part)
+    preload_numpy()
+
+    with day_context(solver_path):
+        start = time.perf_counter()
+        if input_path is None:
+            result = solve()
+        else:
+            result = solve(LineFile(input_path))
+        seconds = time.perf_counter() - start
+
+    return result, seconds
+
+def run_days(days, input_dir=None, use_cache=True, num_workers=1):
+    '''
+    Run both parts of several days
+
+    Inputs:
+    - days: list of (day, path to solver module) tuples
+    - input_dir: directory containing inputs named <day>.txt. Default is None
+    - use_cache: whether to reuse and save results on disk. Default is True
+    - num_workers: number of processes running parts at the same time. Default
+      is 1, which runs every part in this process one after the other
+
+    Output:
+    - list of (day, part, result, seconds, cached) tuples, in the order of the
+      days and parts. The result is the exception raised if the part failed
+    '''
+    rows = []
+
+    # Parts still to be computed: (index in rows, solver path, part, input
+    # path, cache key)
+    tasks = []
+
+    for day, solver_path in days:
+        input_path = find_input(day, solver_path, input_dir)
+
+        try:
+            module = load_solver(solver_path)
+        except Exception as e:
+            rows.append((day, 'import', e, 0.0, False))
+            continue
+
+        for part in PARTS:
+            if not hasattr(module, part):
+                continue
+
+            key = None
+            if use_cache:
+                start = time.perf_counter()
+                key = cache_key(solver_path, input_path, part)
+                cached = load_cached(key)
+                if cached is not None:
+                    rows.append((day, part, cached[0],
+                            time.perf_counter() - start, True))
+                    continue
+
+            tasks.append((len(rows), solver_path, part, input_path, key))
+            rows.append((day, part, None, 0.0, False))
+
+    if num_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(run_part, *task[1:4]) for task in tasks]
+            outcomes = [_outcome(future.result) for future in futures]
+    else:
+        outcomes = [_outcome(run_part, *task[1:4]) for task in tasks]
+
+    for (idx, _, _, _, key), (result, seconds, failed) in zip(tasks, outcomes):
+        if use_cache and not failed:
+            store_cached(key, result, seconds)
+
+        rows[idx] = rows[idx][:2] + (result, seconds, False)
+
+    return rows
+
+def _outcome(func, *args):
+    '''
+    Call a function returning (result, seconds), and catch any exception
+
+    Output:
+    - tuple of (result or exception raised, seconds, whether it failed)
+    '''
+    try:
+        return func(*args) + (False,)
+    except Exception as e:
+        return e, 0.0, True
+
+def format_rows(rows):
+    '''
+    Format results as a table
+
+    Input:
+    - rows: list of (day, part, result, seconds, cached) tuples
+
+    Output:
+    - string containing one line per part and a total
+    '''
+    lines = []
+    total = 0.0
+
+    for day, part, result, seconds, cached in rows:
+        if isinstance(result, Exception):
+            result = 'error: %r' % result
+
+        lines.append('%s  %-8s  %10.3fs%s  %s' % (day, part, seconds,
+                ' (cached)' if cached else '         ', result))
+        total += seconds
+
+    lines.append('total          %10.3fs' % total)
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the solvers of every day')
+    parser.add_argument('days', nargs='*',
+            help='days to run, e.g. 03 12. Default is every day')
+    parser.add_argument('--input-dir',
+            help='directory containing inputs named <day>.txt')
+    parser.add_argument('--no-cache', action='store_true',
+            help='recompute every result and leave the cache untouched')
+    parser.add_argument('--workers', type=int, default=1,
+            help='number of parts to run in parallel. Default is %(default)s')
+    args = parser.parse_args(argv)
+
+    days = find_days()
+    if args.days:
+        wanted = set(day.zfill(2) for day in args.days)
+        days = [d for d in days if d[0] in wanted]
+
+    start = time.perf_counter()
+    rows = run_days(days, args.input_dir, use_cache=not args.no_cache,
+            num_workers=args.workers)
+    print(format_rows(rows))
+    print('wall clock     %10.3fs' % (time.perf_counter() - start))
+
+if __name__ == '__main__':
+    main()
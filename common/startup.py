@@ -0,0 +1,108 @@
+#!/usr/bin/python
+'''
+Check that importing the solver of every day stays within a time budget
+
+Usage (from the top of the repository):
+    python -m common.startup [--repeat N] [DAY ...]
+
+Each module is imported in a fresh interpreter, several times, and the fastest
+import is compared to the budget. The exit status is 1 if any module is over
+its budget.
+'''
+
+import argparse
+import subprocess
+import sys
+
+from common.runner import ROOT, find_days
+
+# Default import-time budget of a day, in seconds
+DEFAULT_BUDGET = 0.05
+
+# key: name of the day
+# value: import-time budget in seconds, if not DEFAULT_BUDGET
+BUDGETS = {}
+
+# Imports the shared modules first, so only the day's own imports are timed
+_CHILD = '''
+import sys, time
+sys.path.insert(0, %r)
+from common.runner import load_solver
+start = time.perf_counter()
+load_solver(%r)
+print(time.perf_counter() - start)
+'''
+
+def import_time(solver_path, repeat=5):
+    '''
+    Measure the time taken to import the solver of a day
+
+    Inputs:
+    - solver_path: path to the solver module of the day
+    - repeat: number of fresh interpreters to import it in. Default is 5
+
+    Output:
+    - fastest import time in seconds
+    '''
+    times = []
+
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _CHILD % (ROOT, solver_path)],
+                check=True, stdout=subprocess.PIPE, universal_newlines=True)
+        times.append(float(out.stdout))
+
+    return min(times)
+
+def check_budgets(days, repeat=5):
+    '''
+    Compare the import time of several days to their budgets
+
+    Inputs:
+    - days: list of (day, path to solver module) tuples
+    - repeat: number of fresh interpreters to import each in. Default is 5
+
+    Output:
+    - generator of (day, seconds, budget) tuples. seconds is the exception
+      raised if the import failed
+    '''
+    for day, solver_path in days:
+        budget = BUDGETS.get(day, DEFAULT_BUDGET)
+
+        try:
+            seconds = import_time(solver_path, repeat)
+        except subprocess.CalledProcessError as e:
+            seconds = e
+
+        yield day, seconds, budget
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Check the import time of every day against a budget')
+    parser.add_argument('days', nargs='*',
+            help='days to check, e.g. 10 11. Default is every day')
+    parser.add_argument('--repeat', type=int, default=5,
+            help='number of imports to take the fastest of. Default is %(default)s')
+    args = parser.parse_args(argv)
+
+    days = find_days()
+    if args.days:
+        wanted = set(day.zfill(2) for day in args.days)
+        days = [d for d in days if d[0] in wanted]
+
+    failed = False
+
+    for day, seconds, budget in check_budgets(days, args.repeat):
+        if isinstance(seconds, Exception):
+            print('%s  import failed' % day)
+            failed = True
+        elif seconds > budget:
+            print('%s  %8.1fms  over budget of %.1fms' % (day, seconds * 1e3,
+                    budget * 1e3))
+            failed = True
+        else:
+            print('%s  %8.1fms  ok' % (day, seconds * 1e3))
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()